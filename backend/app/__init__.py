@@ -3,15 +3,20 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from config import config
 from flask_cors import CORS
+from app.banco import SessaoRoteada
 
 # Inicialização das extensões
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
 jwt = JWTManager()
 
 def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
 
+    # Serialização JSON rápida (orjson, com datas nativas e fragmentos pré-codificados)
+    from app.serializacao import ProvedorJSON
+    app.json = ProvedorJSON(app)
+
     # Configurações do JWT
     app.config['JWT_TOKEN_LOCATION'] = ['headers']
     app.config['JWT_COOKIE_CSRF_PROTECT'] = False
@@ -42,32 +47,78 @@ def create_app(config_name='default'):
         if request.method == 'OPTIONS':
             return '', 200
         return jsonify({'message': 'Token expired'}), 401
+    # Pool de hashing de senhas cheio: recusar em vez de enfileirar no worker
+    from app.senhas import SenhasSobrecarregadas
+    @app.errorhandler(SenhasSobrecarregadas)
+    def senhas_sobrecarregadas(err):
+        return jsonify({'message': 'Servidor ocupado. Tente novamente em instantes.'}), 503, {'Retry-After': '1'}
     # Registro dos blueprints
     from app.resources.auth import auth_bp
     from app.resources.user import user_bp
     from app.resources.assessment import assessment_bp
     from app.resources.desafio import desafio_bp
+    from app.resources.sincronizacao import sync_bp
+    from app.resources.ranking import ranking_bp
     
+    # Instrumentação: tempo por endpoint, consultas SQL, Server-Timing e log de requisições lentas
+    from app import instrumentacao
+
+    @app.before_request
+    def before_request():
+        instrumentacao.iniciar_requisicao()
+
     @app.after_request
     def after_request(response):
      #  response.headers.add('Access-Control-Allow-Origin', 'http://localhost:3000')
      #  response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
      #  response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
      #  response.headers.add('Access-Control-Allow-Credentials', 'true')
-        return response
+        return instrumentacao.finalizar_requisicao(response)
+
+    # Compressão das respostas; registrada depois da instrumentação para que o tempo dela seja medido
+    from app.compressao import registrar_compressao
+    registrar_compressao(app)
+
+    # Leituras de requisições GET na réplica (apenas com o bind 'replica' configurado)
+    from app.banco import registrar_roteamento
+    registrar_roteamento(app)
+
+    # Perfil de requisições sob demanda (apenas com PERFIL_ATIVO)
+    from app.perfilador import registrar_perfilador
+    registrar_perfilador(app)
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(user_bp, url_prefix='/api/users')
     app.register_blueprint(assessment_bp, url_prefix='/api/assessments')
     app.register_blueprint(desafio_bp, url_prefix='/api/desafios')
+    app.register_blueprint(sync_bp, url_prefix='/api/sync')
+    app.register_blueprint(ranking_bp, url_prefix='/api/ranking')
 
     # Rota de teste para verificar se a API está funcionando
     @app.route('/api/ping', methods=['GET'])
     def ping():
         return {'message': 'API HUMANIQ esta online!'}, 200
 
+    # Métricas no formato do Prometheus, somando todos os workers do gunicorn
+    from app import metricas
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return metricas.exportar()
+
+    # Cache do catálogo de perguntas (registra os eventos de invalidação)
+    from app import catalogo  # noqa: F401
+
+    # Comandos de manutenção (flask recalcular-estatisticas, ...)
+    from app.commands import registrar_comandos
+    registrar_comandos(app)
+
     # Criação das tabelas do banco de dados
+    from app.banco import aplicar_pragmas_sqlite
     with app.app_context():
+        for engine in db.engines.values():
+            aplicar_pragmas_sqlite(engine, app.config['SQLITE_PRAGMAS'])
         db.create_all()
+        metricas.observar_pool(db.engine)
 
     return app
\ No newline at end of file
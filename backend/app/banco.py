@@ -0,0 +1,78 @@
+import time
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+def aplicar_pragmas_sqlite(engine, pragmas):
+    """
+    Executa os PRAGMAs configurados em cada nova conexão SQLite do engine (ex.: journal_mode=WAL)
+    """
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _aplicar(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for nome, valor in pragmas.items():
+                cursor.execute(f"PRAGMA {nome}={valor}")
+        finally:
+            cursor.close()
+
+# Bind da réplica de leitura em SQLALCHEMY_BINDS e cookie que mantém o cliente no primário após uma escrita
+BIND_REPLICA = 'replica'
+COOKIE_PRIMARIO = 'humaniq_primario'
+
+class SessaoRoteada(Session):
+    """
+    Sessão que envia as leituras das requisições GET para a réplica, quando configurada.
+    Escritas (flush, INSERT/UPDATE/DELETE) sempre vão para o banco principal.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not getattr(clause, 'is_dml', False) and _usar_replica():
+            return self._db.engines[BIND_REPLICA]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def _usar_replica():
+    return has_request_context() and g.get('_usar_replica', False)
+
+def _registrar_escrita():
+    if has_request_context():
+        g._escrita_realizada = True
+        # O restante da requisição lê do principal, para enxergar o que acabou de gravar
+        g._usar_replica = False
+
+@event.listens_for(OrmSession, 'after_flush')
+def _escrita_por_flush(session, flush_context):
+    _registrar_escrita()
+
+@event.listens_for(OrmSession, 'do_orm_execute')
+def _escrita_por_execucao(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _registrar_escrita()
+
+def registrar_roteamento(app):
+    """
+    Registra o roteamento de leituras para a réplica, apenas se o bind 'replica' estiver configurado
+    """
+    if BIND_REPLICA not in app.config.get('SQLALCHEMY_BINDS', {}):
+        return
+
+    @app.before_request
+    def escolher_banco():
+        # Depois de uma escrita, o cliente lê do principal durante REPLICA_JANELA_ESCRITA segundos
+        try:
+            fixado_ate = float(request.cookies.get(COOKIE_PRIMARIO, 0))
+        except ValueError:
+            fixado_ate = 0
+        g._usar_replica = request.method in ('GET', 'HEAD') and fixado_ate < time.time()
+
+    @app.after_request
+    def fixar_no_primario(response):
+        if g.get('_escrita_realizada'):
+            janela = app.config['REPLICA_JANELA_ESCRITA']
+            response.set_cookie(COOKIE_PRIMARIO, str(int(time.time()) + janela), max_age=janela,
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,89 @@
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import metricas
+from app.serializacao import FragmentoJSON
+
+class CatalogoPerguntas:
+    """
+    Dados derivados do catálogo de perguntas do teste inicial, montados uma única vez por versão
+    """
+
+    def __init__(self, versao, perguntas):
+        self.versao = versao
+        # perguntas já vêm ordenadas por `ordem`
+        self.ordem = [str(p.id) for p in perguntas]
+        self.ids = frozenset(self.ordem)
+        self.categorias_por_pergunta = {str(p.id): p.categoria for p in perguntas}
+        # Lista já codificada em JSON: as respostas a incorporam sem recodificar
+        self.payload = FragmentoJSON(current_app.json.dumps([p.to_dict() for p in perguntas]))
+
+class CacheCatalogo:
+    """
+    Cache em memória do catálogo de perguntas, validado pela versão gravada no banco.
+
+    Cada worker do gunicorn mantém sua própria cópia. Escritas no catálogo incrementam
+    a versão na mesma transação; os demais workers percebem a mudança na próxima
+    verificação, feita no máximo a cada CATALOGO_CACHE_TTL segundos.
+    """
+
+    NOME_VERSAO = 'perguntas'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._catalogo = None
+        self._verificado_em = 0.0
+
+    def obter(self):
+        """Retorna o catálogo atual, consultando o banco apenas quando necessário"""
+        from app.models import PerguntaTeste, VersaoCatalogo
+
+        ttl = current_app.config.get('CATALOGO_CACHE_TTL', 0)
+        catalogo = self._catalogo
+        if catalogo is not None and time.monotonic() - self._verificado_em < ttl:
+            metricas.registrar_cache('catalogo_perguntas', True)
+            return catalogo
+
+        with self._lock:
+            versao = VersaoCatalogo.atual(self.NOME_VERSAO)
+            atualizado = self._catalogo is not None and self._catalogo.versao == versao
+            metricas.registrar_cache('catalogo_perguntas', atualizado)
+            if not atualizado:
+                perguntas = PerguntaTeste.query.order_by(PerguntaTeste.ordem).all()
+                self._catalogo = CatalogoPerguntas(versao, perguntas)
+            self._verificado_em = time.monotonic()
+            return self._catalogo
+
+    def invalidar(self):
+        with self._lock:
+            self._catalogo = None
+            self._verificado_em = 0.0
+
+catalogo_perguntas = CacheCatalogo()
+
+@event.listens_for(Session, 'before_flush')
+def _incrementar_versao_catalogo(session, flush_context, instances):
+    """Incrementa a versão do catálogo quando perguntas são criadas, alteradas ou removidas"""
+    from app.models import PerguntaTeste, VersaoCatalogo
+
+    alteradas = [
+        obj for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, PerguntaTeste)
+    ]
+    if not alteradas:
+        return
+
+    with session.no_autoflush:
+        VersaoCatalogo.incrementar(session, CacheCatalogo.NOME_VERSAO)
+    session.info['catalogo_alterado'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_catalogo_local(session):
+    if session.info.pop('catalogo_alterado', False):
+        catalogo_perguntas.invalidar()
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_alteracao_catalogo(session):
+    session.info.pop('catalogo_alterado', None)
@@ -0,0 +1,231 @@
+import click
+from flask.cli import with_appcontext
+from app import db
+
+@click.command('recalcular-estatisticas')
+@click.option('--usuario', 'usuario_id', type=int, default=None, help='Recalcular apenas este usuário')
+@with_appcontext
+def recalcular_estatisticas(usuario_id):
+    """
+    Reconstrói as estatísticas desnormalizadas dos usuários a partir dos resultados
+    """
+    from app.models import Usuario, EstatisticaUsuario
+
+    query = Usuario.query
+    if usuario_id is not None:
+        query = query.filter_by(id=usuario_id)
+
+    total = 0
+    for usuario in query.all():
+        usuario.estatisticas = EstatisticaUsuario.recalcular(usuario)
+        total += 1
+
+    db.session.commit()
+    click.echo(f"Estatísticas recalculadas para {total} usuário(s).")
+
+@click.command('recalcular-sequencias')
+@with_appcontext
+def recalcular_sequencias():
+    """
+    Preenche o estado das sequências (dias consecutivos) a partir do histórico de resultados
+    """
+    from itertools import groupby
+    from app.models import Usuario, Resultado, EstatisticaUsuario
+
+    # Uma única leitura ordenada do histórico, agrupada por usuário
+    historico = db.session.query(Resultado.usuario_id, Resultado.data_conclusao).filter(
+        Resultado.status == 'concluído',
+        Resultado.data_conclusao.isnot(None)
+    ).order_by(Resultado.usuario_id, Resultado.data_conclusao.desc())
+
+    sequencias = {}
+    for usuario_id, linhas in groupby(historico.yield_per(1000), key=lambda linha: linha[0]):
+        dias = [data.date() for _, data in linhas]
+        sequencias[usuario_id] = (EstatisticaUsuario.calcular_sequencia_historico(dias), dias[0])
+
+    total = 0
+    for usuario in Usuario.query.all():
+        estatisticas = usuario.obter_estatisticas()
+        estatisticas.sequencia_atual, estatisticas.data_ultima_conclusao = sequencias.get(usuario.id, (0, None))
+        total += 1
+
+    db.session.commit()
+    click.echo(f"Sequências recalculadas para {total} usuário(s).")
+
+@click.command('preencher-medias-avaliacoes')
+@click.option('--todas', is_flag=True, help='Recalcular também as avaliações que já possuem médias')
+@with_appcontext
+def preencher_medias_avaliacoes(todas):
+    """
+    Calcula e armazena as médias por categoria das avaliações existentes
+    """
+    from app.models import Avaliacao
+    from app.catalogo import catalogo_perguntas
+
+    categorias_por_pergunta = catalogo_perguntas.obter().categorias_por_pergunta
+    query = Avaliacao.query
+    if not todas:
+        query = query.filter(~Avaliacao.medias.any())
+
+    total = 0
+    for avaliacao in query.all():
+        avaliacao.definir_medias(avaliacao.calcular_medias_por_categoria(categorias_por_pergunta))
+        total += 1
+
+    db.session.commit()
+    click.echo(f"Médias por categoria armazenadas para {total} avaliação(ões).")
+
+@click.command('recorrigir-desafio')
+@click.argument('desafio_id', type=int)
+@click.option('--lote', default=5000, help='Quantidade de submissões corrigidas por vez')
+@with_appcontext
+def recorrigir_desafio(desafio_id, lote):
+    """
+    Recalcula a pontuação de todas as submissões de um desafio (ex.: após corrigir o gabarito)
+    """
+    from sqlalchemy import update
+    from app.models import Resultado, EstatisticaUsuario, ProgressoPeriodo
+    from app.pontuacao import gabaritos
+
+    gabaritos.invalidar(desafio_id)
+    gabarito = gabaritos.obter(desafio_id)
+    if not gabarito:
+        raise click.ClickException(f"Desafio {desafio_id} não encontrado")
+
+    # Paginação por Resultado.id: no máximo `lote` submissões em memória de cada vez
+    consulta = db.session.query(
+        Resultado.id, Resultado.usuario_id, Resultado.status, Resultado.pontuacao, Resultado.respostas_quiz,
+        Resultado.data_conclusao
+    ).filter(
+        Resultado.desafio_id == desafio_id,
+        Resultado.respostas_quiz.isnot(None)
+    ).order_by(Resultado.id)
+
+    total = 0
+    total_alteradas = 0
+    ajustes = {}
+    ajustes_periodos = {}
+    ultimo_id = 0
+    while True:
+        parte = consulta.filter(Resultado.id > ultimo_id).limit(lote).all()
+        if not parte:
+            break
+        ultimo_id = parte[-1].id
+        total += len(parte)
+
+        alteradas = []
+        pontuacoes = gabarito.corrigir_lote([submissao.respostas_quiz for submissao in parte])
+        for submissao, pontuacao in zip(parte, pontuacoes):
+            if pontuacao == (submissao.pontuacao or 0):
+                continue
+            alteradas.append({'id': submissao.id, 'pontuacao': pontuacao})
+            if submissao.status == 'concluído':
+                diferenca = pontuacao - (submissao.pontuacao or 0)
+                ajustes[submissao.usuario_id] = ajustes.get(submissao.usuario_id, 0) + diferenca
+                if submissao.data_conclusao:
+                    chave = (submissao.usuario_id, submissao.data_conclusao.date())
+                    ajustes_periodos[chave] = ajustes_periodos.get(chave, 0) + diferenca
+
+        if alteradas:
+            db.session.execute(update(Resultado), alteradas)
+            total_alteradas += len(alteradas)
+
+    for usuario_id, diferenca in ajustes.items():
+        db.session.execute(
+            update(EstatisticaUsuario)
+            .where(EstatisticaUsuario.usuario_id == usuario_id)
+            .values(pontos_quiz_total=EstatisticaUsuario.pontos_quiz_total + diferenca)
+        )
+    for (usuario_id, dia), diferenca in ajustes_periodos.items():
+        ProgressoPeriodo.ajustar_pontos(usuario_id, dia, diferenca)
+
+    db.session.commit()
+    click.echo(f"{total} submissão(ões) corrigida(s), {total_alteradas} pontuação(ões) alterada(s).")
+
+@click.command('preencher-progresso')
+@click.option('--usuario', 'usuario_id', type=int, default=None, help='Preencher apenas este usuário')
+@click.option('--lote', default=10000, help='Linhas gravadas por insert')
+@with_appcontext
+def preencher_progresso(usuario_id, lote):
+    """
+    Reconstrói a série de progresso (agregados por dia e por semana) a partir dos resultados concluídos
+    """
+    from itertools import groupby
+    from sqlalchemy import delete, insert
+    from app.models import Resultado, ProgressoPeriodo, XP_POR_DESAFIO
+
+    conclusoes = db.session.query(Resultado.usuario_id, Resultado.data_conclusao, Resultado.pontuacao).filter(
+        Resultado.status == 'concluído',
+        Resultado.data_conclusao.isnot(None)
+    )
+    apagar = delete(ProgressoPeriodo)
+    if usuario_id is not None:
+        conclusoes = conclusoes.filter(Resultado.usuario_id == usuario_id)
+        apagar = apagar.where(ProgressoPeriodo.usuario_id == usuario_id)
+    db.session.execute(apagar)
+
+    linhas = []
+    usuarios = periodos = 0
+    for atual, grupo in groupby(conclusoes.order_by(Resultado.usuario_id).yield_per(lote), key=lambda linha: linha.usuario_id):
+        linhas.extend(ProgressoPeriodo.agregar(atual, ((data, pontuacao) for _, data, pontuacao in grupo), XP_POR_DESAFIO))
+        usuarios += 1
+        if len(linhas) >= lote:
+            db.session.execute(insert(ProgressoPeriodo.__table__), linhas)
+            periodos += len(linhas)
+            linhas = []
+    if linhas:
+        db.session.execute(insert(ProgressoPeriodo.__table__), linhas)
+        periodos += len(linhas)
+
+    db.session.commit()
+    click.echo(f"Série de progresso preenchida: {periodos} período(s) de {usuarios} usuário(s).")
+
+@click.command('migrar')
+@with_appcontext
+def migrar():
+    """
+    Aplica as migrações de esquema e dados em bancos criados por versões anteriores
+    """
+    from app.migrations import aplicar_migracoes
+
+    aplicar_migracoes(echo=click.echo)
+
+@click.command('explicar-consultas')
+@with_appcontext
+def explicar_consultas():
+    """
+    Mostra o plano de execução das consultas mais frequentes e falha se alguma percorrer a tabela inteira
+    """
+    from app.planos import verificar_planos
+
+    if not verificar_planos(echo=click.echo):
+        raise SystemExit(1)
+
+@click.command('token-perfil')
+@click.argument('caminho')
+@click.option('--validade', type=int, default=600, show_default=True, help='Validade do token em segundos')
+@with_appcontext
+def token_perfil(caminho, validade):
+    """
+    Gera o valor do cabeçalho X-Perfil que pede o perfil de uma requisição ao CAMINHO (ex.: /api/users/profile)
+    """
+    from flask import current_app
+    from app.perfilador import gerar_token
+
+    chave = current_app.config['PERFIL_CHAVE']
+    if not chave:
+        raise click.ClickException("Defina PERFIL_CHAVE para gerar tokens de perfil.")
+    click.echo(gerar_token(chave, caminho, validade))
+
+def registrar_comandos(app):
+    """
+    Registra os comandos de manutenção na CLI do Flask
+    """
+    app.cli.add_command(recalcular_estatisticas)
+    app.cli.add_command(recalcular_sequencias)
+    app.cli.add_command(preencher_medias_avaliacoes)
+    app.cli.add_command(recorrigir_desafio)
+    app.cli.add_command(preencher_progresso)
+    app.cli.add_command(migrar)
+    app.cli.add_command(explicar_consultas)
+    app.cli.add_command(token_perfil)
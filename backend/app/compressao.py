@@ -0,0 +1,126 @@
+import gzip
+import threading
+from collections import OrderedDict
+from flask import current_app, request
+from app import metricas
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - o brotli é opcional
+    brotli = None
+
+# Tipos de conteúdo que valem a pena comprimir
+TIPOS_COMPRIMIVEIS = ('application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript')
+
+def codificacoes_disponiveis():
+    """Codificações suportadas, na ordem de preferência do servidor"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def comprimir_dados(dados, codificacao, config):
+    if codificacao == 'br':
+        return brotli.compress(dados, quality=config['COMPRESSAO_NIVEL_BROTLI'])
+    # mtime fixo: os mesmos dados geram sempre os mesmos bytes
+    return gzip.compress(dados, compresslevel=config['COMPRESSAO_NIVEL_GZIP'], mtime=0)
+
+class CacheCompressao:
+    """
+    Cache LRU em memória dos bytes comprimidos de respostas com ETag forte. A ETag identifica a
+    representação, então a mesma ETag e codificação sempre produzem os mesmos bytes comprimidos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._itens = OrderedDict()
+
+    def obter(self, chave, tamanho_original):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None or item[0] != tamanho_original:
+                return None
+            self._itens.move_to_end(chave)
+            return item[1]
+
+    def guardar(self, chave, tamanho_original, comprimido, limite):
+        with self._lock:
+            self._itens[chave] = (tamanho_original, comprimido)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > limite:
+                self._itens.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+cache_compressao = CacheCompressao()
+
+def deve_comprimir(response):
+    """Indica se a representação pode ser comprimida, independentemente do tamanho"""
+    if response.direct_passthrough or response.is_streamed:
+        return False
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if 'Content-Encoding' in response.headers or response.mimetype not in TIPOS_COMPRIMIVEIS:
+        return False
+    return 'no-transform' not in response.headers.get('Cache-Control', '')
+
+def enfraquecer_etag(response):
+    """
+    Os bytes mudam com a codificação: a ETag forte passa a ser fraca (equivalência semântica).
+    Retorna a ETag forte original, ou None se a resposta não tinha uma.
+    """
+    etag, fraca = response.get_etag()
+    if not etag or fraca:
+        return None
+    response.set_etag(etag, weak=True)
+    return etag
+
+def comprimir_resposta(response):
+    """
+    Comprime a resposta com a melhor codificação aceita pelo cliente (Accept-Encoding).
+
+    A ETag e o Vary dependem só do Accept-Encoding, não do tamanho da resposta: o 304 de uma
+    resposta condicional (sem corpo) sai com a mesma ETag fraca e o mesmo Vary do 200.
+    """
+    config = current_app.config
+    if response.status_code == 304:
+        if response.get_etag()[0]:
+            response.vary.add('Accept-Encoding')
+            if request.accept_encodings.best_match(codificacoes_disponiveis()) is not None:
+                enfraquecer_etag(response)
+        return response
+    if not deve_comprimir(response):
+        return response
+
+    # A representação depende do Accept-Encoding mesmo quando não é comprimida
+    response.vary.add('Accept-Encoding')
+    codificacao = request.accept_encodings.best_match(codificacoes_disponiveis())
+    if codificacao is None:
+        return response
+
+    etag = enfraquecer_etag(response)
+    if response.content_length is None or response.content_length < config['COMPRESSAO_MINIMO']:
+        return response
+
+    dados = response.get_data()
+    limite_cache = config['COMPRESSAO_CACHE_ITENS']
+    chave = (etag, codificacao) if etag and limite_cache else None
+
+    comprimido = cache_compressao.obter(chave, len(dados)) if chave else None
+    if chave:
+        metricas.registrar_cache('respostas_comprimidas', comprimido is not None)
+    if comprimido is None:
+        comprimido = comprimir_dados(dados, codificacao, config)
+        if chave:
+            cache_compressao.guardar(chave, len(dados), comprimido, limite_cache)
+
+    response.set_data(comprimido)
+    response.headers['Content-Encoding'] = codificacao
+    return response
+
+def registrar_compressao(app):
+    """
+    Registra a compressão das respostas apenas quando COMPRESSAO_ATIVA está ligada
+    """
+    if not app.config['COMPRESSAO_ATIVA']:
+        return
+    app.after_request(comprimir_resposta)
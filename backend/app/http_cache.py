@@ -0,0 +1,51 @@
+import hashlib
+from datetime import timezone
+from flask import current_app, make_response, request
+from app import metricas
+
+def etag_forte(*partes):
+    """
+    Gera uma ETag a partir dos valores que identificam a representação (ids, versões, datas)
+    """
+    return hashlib.sha1(repr(partes).encode()).hexdigest()
+
+def _em_utc(data):
+    # As datas do banco são gravadas em UTC sem fuso horário
+    if data is not None and data.tzinfo is None:
+        return data.replace(tzinfo=timezone.utc)
+    return data
+
+def nao_modificado(etag, ultima_modificacao=None):
+    """
+    Indica se a cópia do cliente ainda é válida. If-None-Match tem precedência sobre If-Modified-Since.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+
+    if ultima_modificacao is not None and request.if_modified_since is not None:
+        return _em_utc(ultima_modificacao).replace(microsecond=0) <= request.if_modified_since
+
+    return False
+
+def resposta_condicional(etag, gerar, ultima_modificacao=None):
+    """
+    Responde 304 sem chamar `gerar` quando o cliente já tem a versão atual; caso contrário,
+    usa o retorno de `gerar` (o mesmo aceito por uma view) como resposta.
+    """
+    valida = nao_modificado(etag, ultima_modificacao)
+    metricas.registrar_cache('respostas_condicionais', valida)
+    if valida:
+        resposta = current_app.response_class(status=304)
+    else:
+        resposta = make_response(gerar())
+        if resposta.status_code != 200:
+            return resposta
+
+    resposta.set_etag(etag)
+    if ultima_modificacao is not None:
+        resposta.last_modified = _em_utc(ultima_modificacao)
+
+    # A resposta depende do usuário autenticado e deve ser revalidada a cada uso
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    resposta.vary.add('Authorization')
+    return resposta
@@ -0,0 +1,63 @@
+from flask import current_app
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity
+from app import db
+
+def claims_usuario(usuario):
+    """
+    Dados baratos do usuário embutidos no token de acesso
+    """
+    return {
+        'nome': usuario.nome,
+        'nivel': usuario.nivel,
+        'teste_inicial_concluido': usuario.teste_inicial_concluido,
+        'versao_perfil': usuario.versao_perfil
+    }
+
+def criar_token_acesso(usuario):
+    return create_access_token(identity=str(usuario.id), additional_claims=claims_usuario(usuario))
+
+def identidade_resumida(usuario):
+    return {
+        'id': usuario.id,
+        'nome': usuario.nome,
+        'nivel': usuario.nivel,
+        'teste_inicial_concluido': usuario.teste_inicial_concluido
+    }
+
+def modo_claims():
+    return current_app.config.get('JWT_CLAIMS_MODO', 'desligado')
+
+def identidade_atual():
+    """
+    Retorna a identidade resumida do usuário autenticado a partir das claims do token.
+
+    No modo 'token' as claims são usadas sem consultar o banco. No modo 'versao' é lida
+    apenas a versão do perfil; o usuário completo só é carregado se as claims estiverem
+    desatualizadas. Retorna None se o usuário não existir mais.
+    """
+    from app.models import Usuario
+
+    claims = get_jwt()
+    usuario_id = int(get_jwt_identity())
+
+    if 'versao_perfil' in claims:
+        if modo_claims() == 'token':
+            return identidade_claims(usuario_id, claims)
+
+        versao = db.session.query(Usuario.versao_perfil).filter_by(id=usuario_id).scalar()
+        if versao is None:
+            return None
+        if versao == claims['versao_perfil']:
+            return identidade_claims(usuario_id, claims)
+
+    # Token antigo (sem claims) ou perfil alterado depois da emissão do token
+    usuario = db.session.get(Usuario, usuario_id)
+    return identidade_resumida(usuario) if usuario else None
+
+def identidade_claims(usuario_id, claims):
+    return {
+        'id': usuario_id,
+        'nome': claims['nome'],
+        'nivel': claims['nivel'],
+        'teste_inicial_concluido': claims['teste_inicial_concluido']
+    }
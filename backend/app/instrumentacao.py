@@ -0,0 +1,79 @@
+import time
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import metricas
+
+# Quantidade máxima de consultas listadas no log de uma requisição lenta
+MAX_CONSULTAS_LOG = 50
+
+class MedicaoRequisicao:
+    """Tempo de parede e consultas SQL (texto e duração) de uma requisição"""
+
+    __slots__ = ('inicio', 'consultas', 'tempo_db')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = []
+        self.tempo_db = 0.0
+
+def medicao_atual():
+    """Medição da requisição em andamento, ou None fora de uma requisição instrumentada"""
+    if not has_request_context():
+        return None
+    return g.get('_medicao')
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _antes_consulta(conn, cursor, statement, parameters, context, executemany):
+    if medicao_atual() is not None:
+        conn.info.setdefault('_inicio_consultas', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _depois_consulta(conn, cursor, statement, parameters, context, executemany):
+    medicao = medicao_atual()
+    inicios = conn.info.get('_inicio_consultas')
+    if medicao is None or not inicios:
+        return
+    duracao = time.perf_counter() - inicios.pop()
+    medicao.tempo_db += duracao
+    medicao.consultas.append((statement, duracao))
+
+@event.listens_for(Engine, 'handle_error')
+def _erro_consulta(contexto):
+    inicios = contexto.connection.info.get('_inicio_consultas') if contexto.connection is not None else None
+    if inicios:
+        inicios.pop()
+
+def iniciar_requisicao():
+    if current_app.config['INSTRUMENTACAO_ATIVA']:
+        g._medicao = MedicaoRequisicao()
+
+def finalizar_requisicao(response):
+    """
+    Registra o tempo da requisição nas métricas, adiciona o cabeçalho Server-Timing e loga as requisições lentas
+    """
+    medicao = g.pop('_medicao', None)
+    if medicao is None:
+        return response
+
+    duracao_ms = (time.perf_counter() - medicao.inicio) * 1000
+    tempo_db_ms = medicao.tempo_db * 1000
+    endpoint = request.endpoint or 'desconhecido'
+    metricas.observar_requisicao(endpoint, request.method, response.status_code, duracao_ms / 1000)
+
+    response.headers['Server-Timing'] = (
+        f'app;dur={duracao_ms:.1f}, db;dur={tempo_db_ms:.1f};desc="{len(medicao.consultas)} consultas SQL"'
+    )
+
+    if duracao_ms >= current_app.config['REQUISICAO_LENTA_MS']:
+        linhas = [
+            f"Requisição lenta: {request.method} {request.path} ({endpoint}) -> {response.status_code} "
+            f"em {duracao_ms:.1f} ms; {len(medicao.consultas)} consultas SQL em {tempo_db_ms:.1f} ms"
+        ]
+        for statement, duracao in medicao.consultas[:MAX_CONSULTAS_LOG]:
+            linhas.append(f"  [{duracao * 1000:7.1f} ms] {' '.join(statement.split())[:300]}")
+        if len(medicao.consultas) > MAX_CONSULTAS_LOG:
+            linhas.append(f"  ... mais {len(medicao.consultas) - MAX_CONSULTAS_LOG} consultas")
+        current_app.logger.warning('\n'.join(linhas))
+
+    return response
@@ -0,0 +1,82 @@
+import os
+import threading
+from flask import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import event
+
+# Com vários workers do gunicorn, cada processo grava suas métricas em arquivos no diretório
+# PROMETHEUS_MULTIPROC_DIR (configurado em gunicorn.conf.py) e o /metrics soma todos eles
+MULTIPROCESSO = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+duracao_requisicoes = Histogram(
+    'humaniq_requisicao_duracao_segundos',
+    'Duração das requisições por endpoint, método e status',
+    ['endpoint', 'metodo', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+
+logins = Counter(
+    'humaniq_logins_total',
+    'Tentativas de login por resultado (sucesso, falha, recusado)',
+    ['resultado']
+)
+
+duracao_hash_senha = Histogram(
+    'humaniq_hash_senha_duracao_segundos',
+    'Duração do hashing e da verificação de senhas (incluindo a espera no pool de processos)',
+    ['operacao'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+
+consultas_cache = Counter(
+    'humaniq_cache_consultas_total',
+    'Consultas aos caches em memória por cache e resultado (acerto, falha)',
+    ['cache', 'resultado']
+)
+
+conexoes_em_uso = Gauge(
+    'humaniq_db_pool_conexoes_em_uso',
+    'Conexões do pool do SQLAlchemy em uso',
+    multiprocess_mode='livesum'
+)
+
+conexoes_overflow = Gauge(
+    'humaniq_db_pool_overflow',
+    'Conexões abertas além do tamanho do pool do SQLAlchemy',
+    multiprocess_mode='livesum'
+)
+
+def registrar_cache(cache, acerto):
+    consultas_cache.labels(cache=cache, resultado='acerto' if acerto else 'falha').inc()
+
+def observar_requisicao(endpoint, metodo, status, duracao):
+    duracao_requisicoes.labels(endpoint=endpoint, metodo=metodo, status=str(status)).observe(duracao)
+
+def observar_pool(engine):
+    """
+    Atualiza os gauges do pool a cada conexão retirada ou devolvida
+    """
+    pool = engine.pool
+    tamanho = pool.size() if hasattr(pool, 'size') else 0
+    lock = threading.Lock()
+    em_uso = [0]
+
+    def atualizar(variacao):
+        with lock:
+            em_uso[0] += variacao
+            conexoes_em_uso.set(em_uso[0])
+            conexoes_overflow.set(max(em_uso[0] - tamanho, 0) if tamanho else 0)
+
+    event.listen(pool, 'checkout', lambda *args: atualizar(1))
+    event.listen(pool, 'checkin', lambda *args: atualizar(-1))
+
+def exportar():
+    """Resposta no formato de texto do Prometheus com as métricas de todos os workers"""
+    if MULTIPROCESSO:
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return Response(generate_latest(registro), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,179 @@
+from sqlalchemy import func, insert, inspect, select, text
+from app import db
+
+# Passos de migração, na ordem em que devem ser aplicados. Cada passo é idempotente:
+# verifica o estado atual do banco antes de alterá-lo.
+MIGRACOES = []
+
+def migracao(funcao):
+    MIGRACOES.append(funcao)
+    return funcao
+
+def indice_existe(conexao, tabela, nome):
+    return any(indice['name'] == nome for indice in inspect(conexao).get_indexes(tabela))
+
+def coluna_existe(conexao, tabela, nome):
+    return any(coluna['name'] == nome for coluna in inspect(conexao).get_columns(tabela))
+
+def adicionar_coluna(conexao, modelo, nome):
+    """Adiciona ao banco uma coluna declarada no modelo, se ela ainda não existir"""
+    tabela = modelo.__table__
+    if coluna_existe(conexao, tabela.name, nome):
+        return False
+
+    coluna = tabela.c[nome]
+    ddl = f"ALTER TABLE {tabela.name} ADD COLUMN {coluna.name} {coluna.type.compile(conexao.dialect)}"
+    if coluna.server_default is not None:
+        ddl += f" DEFAULT {coluna.server_default.arg}"
+        if not coluna.nullable:
+            ddl += " NOT NULL"
+    conexao.execute(text(ddl))
+    return True
+
+@migracao
+def remover_resultados_duplicados(conexao):
+    """Mantém um único resultado por (usuário, desafio), preferindo o concluído mais recente"""
+    duplicados = conexao.execute(text(
+        "SELECT usuario_id, desafio_id FROM resultados "
+        "GROUP BY usuario_id, desafio_id HAVING COUNT(*) > 1"
+    )).all()
+
+    removidos = 0
+    for usuario_id, desafio_id in duplicados:
+        ids = conexao.execute(text(
+            "SELECT id FROM resultados WHERE usuario_id = :usuario_id AND desafio_id = :desafio_id "
+            "ORDER BY CASE WHEN status = 'concluído' THEN 0 ELSE 1 END, "
+            "CASE WHEN data_conclusao IS NULL THEN 1 ELSE 0 END, data_conclusao DESC, id DESC"
+        ), {'usuario_id': usuario_id, 'desafio_id': desafio_id}).scalars().all()
+
+        for resultado_id in ids[1:]:
+            conexao.execute(text("DELETE FROM resultados WHERE id = :id"), {'id': resultado_id})
+            removidos += 1
+
+    if removidos:
+        return f"{removidos} resultado(s) duplicado(s) removido(s); execute recalcular-estatisticas"
+
+@migracao
+def criar_indices_resultados(conexao):
+    """Cria os índices de resultados declarados no modelo em bancos criados antes deles"""
+    from app.models import Resultado
+
+    criados = []
+    for indice in Resultado.__table__.indexes:
+        if not indice_existe(conexao, 'resultados', indice.name):
+            indice.create(conexao)
+            criados.append(indice.name)
+
+    if criados:
+        return f"índices criados: {', '.join(criados)}"
+
+@migracao
+def adicionar_versao_perfil(conexao):
+    """Versão do perfil do usuário, embutida nos tokens de acesso"""
+    from app.models import Usuario
+
+    if adicionar_coluna(conexao, Usuario, 'versao_perfil'):
+        return "coluna usuarios.versao_perfil criada"
+
+@migracao
+def adicionar_data_atualizacao_desafios(conexao):
+    """Data da última alteração do desafio, usada nas respostas condicionais (ETag/Last-Modified)"""
+    from app.models import Desafio
+
+    if adicionar_coluna(conexao, Desafio, 'data_atualizacao'):
+        conexao.execute(text("UPDATE desafios SET data_atualizacao = data_criacao WHERE data_atualizacao IS NULL"))
+        return "coluna desafios.data_atualizacao criada"
+
+@migracao
+def adicionar_id_cliente(conexao):
+    """Identificadores gerados pelo cliente para a sincronização offline"""
+    from app.models import Avaliacao, Resultado
+
+    alteracoes = []
+    if adicionar_coluna(conexao, Avaliacao, 'id_cliente'):
+        alteracoes.append("coluna avaliacoes.id_cliente criada")
+    if adicionar_coluna(conexao, Resultado, 'id_cliente'):
+        alteracoes.append("coluna resultados.id_cliente criada")
+    for indice in Avaliacao.__table__.indexes:
+        if not indice_existe(conexao, 'avaliacoes', indice.name):
+            indice.create(conexao)
+            alteracoes.append(f"índice {indice.name} criado")
+
+    if alteracoes:
+        return '; '.join(alteracoes)
+
+@migracao
+def adicionar_xp_total(conexao):
+    """XP acumulado do usuário, base da atualização atômica de XP e nível"""
+    from app.models import Usuario
+
+    if adicionar_coluna(conexao, Usuario, 'xp_total'):
+        conexao.execute(text("UPDATE usuarios SET xp_total = 10 * nivel * (nivel - 1) + xp"))
+        return "coluna usuarios.xp_total criada"
+
+@migracao
+def criar_indices_perfil(conexao):
+    """Índices (usuario_id, id) que sustentam a paginação das coleções do perfil"""
+    from app.models import Avaliacao, Resultado
+
+    criados = []
+    for modelo in (Avaliacao, Resultado):
+        for indice in modelo.__table__.indexes:
+            if not indice_existe(conexao, modelo.__tablename__, indice.name):
+                indice.create(conexao)
+                criados.append(indice.name)
+
+    if criados:
+        return f"índices criados: {', '.join(criados)}"
+
+@migracao
+def criar_estatisticas_ausentes(conexao):
+    """
+    Estatísticas dos usuários criados antes da tabela estatisticas_usuario. Sem elas, cada leitura
+    do perfil recalcula os contadores a partir dos resultados (e não os grava, por ser um GET).
+    """
+    from itertools import groupby
+    from app.models import Usuario, EstatisticaUsuario, Resultado
+
+    sem_estatisticas = select(Usuario.id).outerjoin(
+        EstatisticaUsuario, EstatisticaUsuario.usuario_id == Usuario.id
+    ).where(EstatisticaUsuario.usuario_id.is_(None))
+    usuarios = conexao.execute(sem_estatisticas).scalars().all()
+    if not usuarios:
+        return
+
+    concluidos = (Resultado.status == 'concluído', Resultado.usuario_id.in_(sem_estatisticas))
+    totais = {
+        usuario_id: (total, pontos)
+        for usuario_id, total, pontos in conexao.execute(
+            select(Resultado.usuario_id, func.count(Resultado.id), func.coalesce(func.sum(Resultado.pontuacao), 0))
+            .where(*concluidos).group_by(Resultado.usuario_id)
+        )
+    }
+
+    # Uma única leitura ordenada das datas de conclusão, agrupada por usuário
+    historico = conexao.execute(
+        select(Resultado.usuario_id, Resultado.data_conclusao)
+        .where(*concluidos, Resultado.data_conclusao.isnot(None))
+        .order_by(Resultado.usuario_id, Resultado.data_conclusao.desc())
+    )
+    sequencias = {}
+    for usuario_id, linhas in groupby(historico, key=lambda linha: linha[0]):
+        dias = [data.date() for _, data in linhas]
+        sequencias[usuario_id] = (EstatisticaUsuario.calcular_sequencia_historico(dias), dias[0])
+
+    linhas = []
+    for usuario_id in usuarios:
+        total, pontos = totais.get(usuario_id, (0, 0))
+        sequencia, ultima = sequencias.get(usuario_id, (0, None))
+        linhas.append({'usuario_id': usuario_id, 'desafios_concluidos': total, 'pontos_quiz_total': pontos,
+                       'sequencia_atual': sequencia, 'data_ultima_conclusao': ultima})
+    conexao.execute(insert(EstatisticaUsuario.__table__), linhas)
+    return f"estatísticas criadas para {len(linhas)} usuário(s)"
+
+def aplicar_migracoes(echo=print):
+    """Aplica todos os passos de migração em uma única transação"""
+    with db.engine.begin() as conexao:
+        for passo in MIGRACOES:
+            mensagem = passo(conexao)
+            echo(f"{passo.__name__}: {mensagem or 'nada a fazer'}")
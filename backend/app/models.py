@@ -1,6 +1,12 @@
+import math
+import sqlite3
 from datetime import datetime, timedelta, timezone
+from sqlalchemy import Integer, case, cast, event, func, insert, inspect, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
 from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app import senhas, ranking
 
 class Usuario(db.Model):
     __tablename__ = 'usuarios'
@@ -13,82 +19,372 @@ class Usuario(db.Model):
     teste_inicial_concluido = db.Column(db.Boolean, default=False)
     nivel = db.Column(db.Integer, default=1)
     xp = db.Column(db.Integer, default=0)
+    # XP acumulado desde o nível 1; nivel e xp (XP dentro do nível) são derivados dele
+    xp_total = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Incrementada a cada alteração nos dados exibidos do usuário (ver atualizar_versao_perfil)
+    versao_perfil = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     # Relacionamentos
     avaliacoes = db.relationship('Avaliacao', backref='usuario', lazy=True)
     resultados = db.relationship('Resultado', backref='usuario', lazy=True)
+    estatisticas = db.relationship('EstatisticaUsuario', backref='usuario', uselist=False, lazy='joined')
+    
+    # Campos serializáveis e a coluna de origem de cada um
+    CAMPOS = {
+        'id': 'id',
+        'nome': 'nome',
+        'email': 'email',
+        'data_cadastro': 'data_cadastro',
+        'created_at': 'data_cadastro',
+        'teste_inicial_concluido': 'teste_inicial_concluido',
+        'nivel': 'nivel',
+        'xp': 'xp',
+    }
+    # Campos calculados e as colunas de que dependem
+    CAMPOS_CALCULADOS = {
+        'proximo_nivel_xp': ('nivel',),
+        'desafios_concluidos': (),
+    }
     
     def __init__(self, nome, email, senha, teste_inicial_concluido=False):
         self.nome = nome
         self.email = email
-        self.senha_hash = generate_password_hash(senha)
+        self.senha_hash = senhas.gerar_hash(senha)
         self.teste_inicial_concluido = teste_inicial_concluido
+        self.estatisticas = EstatisticaUsuario()
     
     def verificar_senha(self, senha):
-        return check_password_hash(self.senha_hash, senha)
+        return senhas.verificar(self.senha_hash, senha)
+    
+    def definir_senha(self, senha):
+        self.senha_hash = senhas.gerar_hash(senha)
+    
+    def atualizar_hash_senha(self, senha):
+        """Regrava o hash com o método configurado, se ele estiver desatualizado. Requer a senha já verificada."""
+        if senhas.precisa_rehash(self.senha_hash):
+            self.definir_senha(senha)
+            return True
+        return False
     
     def calcular_proximo_nivel_xp(self):
         """Calcula XP necessário para o próximo nível"""
         return self.nivel * 20  
     
+    @staticmethod
+    def calcular_xp_total(nivel, xp):
+        """XP acumulado desde o nível 1: os níveis anteriores somam 20 + 40 + ... + 20 * (nivel - 1)"""
+        return 10 * nivel * (nivel - 1) + xp
+    
+    @staticmethod
+    def calcular_nivel(xp_total):
+        """Maior nível n com 10 * n * (n - 1) <= xp_total (inverso de calcular_xp_total)"""
+        return (math.isqrt(4 * (xp_total // 10) + 1) + 1) // 2
+    
     def calcular_desafios_concluidos(self):
         """Calcula número de desafios concluídos"""
-        return Resultado.query.filter_by(
-            usuario_id=self.id, 
-            status='concluído'
-        ).count()
+        return self.obter_estatisticas().desafios_concluidos
     
-    def to_dict(self):
-        """Converte o usuário em um dicionário"""
-        return {
-            'id': self.id,
-            'nome': self.nome,
-            'email': self.email,
-            'data_cadastro': self.data_cadastro.isoformat() if self.data_cadastro else None,
-            'created_at': self.data_cadastro.isoformat() if self.data_cadastro else None,
-            'teste_inicial_concluido': self.teste_inicial_concluido,
-            'nivel': self.nivel,
-            'xp': self.xp,
-            'proximo_nivel_xp': self.calcular_proximo_nivel_xp(),
-            'desafios_concluidos': self.calcular_desafios_concluidos()
-        }
+    def obter_estatisticas(self):
+        """Retorna as estatísticas do usuário, reconstruindo-as se ainda não existirem"""
+        if self.estatisticas is None:
+            self.estatisticas = EstatisticaUsuario.recalcular(self)
+        return self.estatisticas
+    
+    @classmethod
+    def colunas(cls, campos):
+        """Retorna as colunas necessárias para serializar os campos informados"""
+        nomes = {'id'}
+        for campo in campos:
+            nomes.update(cls.CAMPOS_CALCULADOS[campo] if campo in cls.CAMPOS_CALCULADOS else (cls.CAMPOS[campo],))
+        return [getattr(cls, nome) for nome in nomes]
+    
+    def to_dict(self, campos=None):
+        """Converte o usuário em um dicionário, apenas com os campos informados se houver"""
+        if campos is None:
+            campos = [*self.CAMPOS, *self.CAMPOS_CALCULADOS]
+        
+        dados = {}
+        for campo in campos:
+            if campo == 'proximo_nivel_xp':
+                dados[campo] = self.calcular_proximo_nivel_xp()
+            elif campo == 'desafios_concluidos':
+                dados[campo] = self.calcular_desafios_concluidos()
+            else:
+                dados[campo] = getattr(self, self.CAMPOS[campo])
+        return dados
 
     def calcular_sequencia(self):
         """Calcula a sequência atual de dias consecutivos"""
-        resultados = Resultado.query.filter_by(
-            usuario_id=self.id,
-            status='concluído'
-        ).order_by(Resultado.data_conclusao.desc()).all()
+        return self.obter_estatisticas().sequencia_vigente()
+    
+    @classmethod
+    def conceder_xp(cls, usuario_id, quantidade):
+        """
+        Soma XP ao usuário com um único UPDATE, sem ler a linha antes: o nível e o XP dentro do
+        nível são calculados em SQL a partir do novo total, pela fórmula fechada de calcular_nivel.
+        Retorna a linha com nivel, xp, xp_total e versao_perfil, ou None se o usuário não existir.
+        """
+        total = cls.xp_total + quantidade
+        # n = floor((1 + sqrt(1 + 4 * total / 10)) / 2); 4 * total / 10.0 é exato quando total é múltiplo de 10
+        nivel = cast(func.floor((1 + func.sqrt(1 + total * 4 / 10.0)) / 2), Integer)
+        linha = db.session.execute(
+            update(cls).where(cls.id == usuario_id).values(
+                xp_total=total,
+                nivel=nivel,
+                xp=total - 10 * nivel * (nivel - 1),
+                versao_perfil=cls.versao_perfil + 1
+            ).returning(cls.nivel, cls.xp, cls.xp_total, cls.versao_perfil)
+            .execution_options(synchronize_session=False)
+        ).first()
         
-        if not resultados:
+        if linha is not None:
+            ranking.registrar_alteracao('xp', usuario_id, linha.xp_total)
+        return linha
+
+# XP concedido por desafio concluído
+XP_POR_DESAFIO = 10
+
+def insert_sem_conflito(modelo, *colunas_unicas):
+    """
+    INSERT que ignora as linhas que violariam o índice único das colunas informadas
+    (ON CONFLICT DO NOTHING). Nos bancos sem essa cláusula, é um INSERT comum.
+    """
+    inserir = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}.get(db.engine.dialect.name)
+    if inserir is None:
+        return insert(modelo)
+    return inserir(modelo).on_conflict_do_nothing(index_elements=list(colunas_unicas))
+
+# Campos cuja alteração torna desatualizadas as cópias do perfil (claims do JWT, caches)
+CAMPOS_VERSIONADOS_PERFIL = ('nome', 'email', 'nivel', 'xp', 'teste_inicial_concluido')
+
+@event.listens_for(Usuario, 'before_update')
+def atualizar_versao_perfil(mapper, connection, usuario):
+    estado = inspect(usuario)
+    if any(estado.attrs[campo].history.has_changes() for campo in CAMPOS_VERSIONADOS_PERFIL):
+        usuario.versao_perfil = (usuario.versao_perfil or 0) + 1
+
+@event.listens_for(Engine, 'connect')
+def registrar_funcoes_sqlite(dbapi_connection, connection_record):
+    """O cálculo do nível em SQL usa sqrt e floor, que só existem no SQLite compilado com as funções matemáticas"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    try:
+        dbapi_connection.execute("SELECT sqrt(1), floor(1)")
+    except sqlite3.OperationalError:
+        dbapi_connection.create_function('sqrt', 1, math.sqrt, deterministic=True)
+        dbapi_connection.create_function('floor', 1, math.floor, deterministic=True)
+
+class EstatisticaUsuario(db.Model):
+    """Contadores desnormalizados do usuário, mantidos a cada conclusão de desafio"""
+    __tablename__ = 'estatisticas_usuario'
+    
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), primary_key=True)
+    desafios_concluidos = db.Column(db.Integer, nullable=False, default=0)
+    sequencia_atual = db.Column(db.Integer, nullable=False, default=0)
+    data_ultima_conclusao = db.Column(db.Date)
+    pontos_quiz_total = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __init__(self, **kwargs):
+        kwargs.setdefault('desafios_concluidos', 0)
+        kwargs.setdefault('sequencia_atual', 0)
+        kwargs.setdefault('pontos_quiz_total', 0)
+        super().__init__(**kwargs)
+    
+    @classmethod
+    def registrar_conclusao(cls, usuario_id, data_conclusao, pontuacao):
+        """
+        Atualiza os contadores com um desafio recém-concluído em um único UPDATE atômico: a sequência
+        avança com um dia seguido, reinicia após um dia sem atividade e não muda no mesmo dia.
+        Retorna False se o usuário não tiver estatísticas.
+        """
+        dia = data_conclusao.date()
+        ontem = dia - timedelta(days=1)
+        ultima = cls.data_ultima_conclusao
+        linha = db.session.execute(
+            update(cls).where(cls.usuario_id == usuario_id).values(
+                desafios_concluidos=cls.desafios_concluidos + 1,
+                pontos_quiz_total=cls.pontos_quiz_total + (pontuacao or 0),
+                sequencia_atual=case(
+                    (or_(ultima.is_(None), ultima < ontem), 1),
+                    (ultima == ontem, cls.sequencia_atual + 1),
+                    else_=cls.sequencia_atual
+                ),
+                data_ultima_conclusao=case((or_(ultima.is_(None), ultima < dia), dia), else_=ultima)
+            ).returning(cls.desafios_concluidos)
+            .execution_options(synchronize_session=False)
+        ).first()
+        
+        if linha is None:
+            return False
+        ranking.registrar_alteracao('desafios', usuario_id, linha.desafios_concluidos)
+        return True
+    
+    def sequencia_vigente(self, hoje=None):
+        """Retorna a sequência considerando a data atual: ela expira se ontem passou sem atividade"""
+        if self.data_ultima_conclusao is None:
+            return 0
+        
+        hoje = hoje or datetime.utcnow().date()
+        if (hoje - self.data_ultima_conclusao).days > 1:
             return 0
-            
-        sequencia = 1
-        data_anterior = resultados[0].data_conclusao.date()
+        return self.sequencia_atual
+    
+    @staticmethod
+    def calcular_sequencia_historico(dias):
+        """Calcula a sequência que termina no dia mais recente de uma lista de dias em ordem decrescente"""
+        sequencia = 0
+        dia_anterior = None
         
-        for resultado in resultados[1:]:
-            data_atual = resultado.data_conclusao.date()
-            if (data_anterior - data_atual).days == 1:
+        for dia in dias:
+            if dia_anterior is None:
+                sequencia = 1
+            elif (dia_anterior - dia).days == 1:
                 sequencia += 1
-                data_anterior = data_atual
-            else:
+            elif dia != dia_anterior:
                 break
+            dia_anterior = dia
         
         return sequencia
     
-    def adicionar_xp(self, quantidade):
-        """Adiciona XP e atualiza nível se necessário"""
-        self.xp += quantidade
-
-        # Verifica se deve subir de nível
-        while self.xp >= self.calcular_proximo_nivel_xp():
-            self.xp -= self.calcular_proximo_nivel_xp()
-            self.nivel += 1
+    def ajustar_pontuacao(self, diferenca):
+        """Ajusta o total de pontos quando um desafio concluído é reavaliado"""
+        self.pontos_quiz_total += diferenca
+    
+    @classmethod
+    def recalcular(cls, usuario):
+        """Reconstrói as estatísticas de um usuário a partir da tabela de resultados"""
+        total, pontos, ultima = db.session.query(
+            func.count(Resultado.id),
+            func.coalesce(func.sum(Resultado.pontuacao), 0),
+            func.max(Resultado.data_conclusao)
+        ).filter(
+            Resultado.usuario_id == usuario.id,
+            Resultado.status == 'concluído'
+        ).one()
+        
+        datas = db.session.query(Resultado.data_conclusao).filter(
+            Resultado.usuario_id == usuario.id,
+            Resultado.status == 'concluído',
+            Resultado.data_conclusao.isnot(None)
+        ).order_by(Resultado.data_conclusao.desc())
+        
+        estatisticas = usuario.estatisticas or cls()
+        estatisticas.desafios_concluidos = total
+        estatisticas.pontos_quiz_total = pontos
+        estatisticas.data_ultima_conclusao = ultima.date() if ultima else None
+        estatisticas.sequencia_atual = cls.calcular_sequencia_historico(
+            data.date() for (data,) in datas.yield_per(500)
+        )
+        return estatisticas
+    
+    def to_dict(self):
+        return {
+            'desafios_concluidos': self.desafios_concluidos,
+            'sequencia_atual': self.sequencia_atual,
+            'data_ultima_conclusao': self.data_ultima_conclusao,
+            'pontos_quiz_total': self.pontos_quiz_total
+        }
 
-        return self.nivel
+class ProgressoPeriodo(db.Model):
+    """
+    Conclusões, pontos e XP do usuário agregados por dia e por semana (iniciada na segunda-feira),
+    mantidos a cada conclusão de desafio. A chave primária atende a série de um usuário com uma
+    única leitura por intervalo do índice.
+    """
+    __tablename__ = 'progresso_periodos'
+    
+    GRANULARIDADES = ('dia', 'semana')
+    
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), primary_key=True)
+    granularidade = db.Column(db.String(10), primary_key=True)
+    inicio = db.Column(db.Date, primary_key=True)
+    conclusoes = db.Column(db.Integer, nullable=False, default=0)
+    pontos = db.Column(db.Integer, nullable=False, default=0)
+    xp = db.Column(db.Integer, nullable=False, default=0)
+    
+    @staticmethod
+    def inicio_periodo(dia, granularidade):
+        """Primeiro dia do período que contém `dia`"""
+        if granularidade == 'semana':
+            return dia - timedelta(days=dia.weekday())
+        return dia
+    
+    @classmethod
+    def agregar(cls, usuario_id, conclusoes, xp_por_conclusao):
+        """Linhas de todos os períodos a partir de conclusões (data_conclusao, pontuacao)"""
+        periodos = {}
+        for data_conclusao, pontuacao in conclusoes:
+            for granularidade in cls.GRANULARIDADES:
+                chave = (granularidade, cls.inicio_periodo(data_conclusao.date(), granularidade))
+                totais = periodos.setdefault(chave, [0, 0, 0])
+                totais[0] += 1
+                totais[1] += pontuacao or 0
+                totais[2] += xp_por_conclusao
+        return [
+            {'usuario_id': usuario_id, 'granularidade': granularidade, 'inicio': inicio,
+             'conclusoes': quantidade, 'pontos': pontos, 'xp': xp}
+            for (granularidade, inicio), (quantidade, pontos, xp) in periodos.items()
+        ]
+    
+    @classmethod
+    def registrar_conclusao(cls, usuario_id, data_conclusao, pontuacao, xp):
+        """Soma uma conclusão ao dia e à semana dela com um único INSERT ... ON CONFLICT atômico"""
+        linhas = cls.agregar(usuario_id, [(data_conclusao, pontuacao)], xp)
+        inserir = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}.get(db.engine.dialect.name)
+        if inserir is None:
+            for linha in linhas:
+                cls._somar_periodo(linha)
+            return
+        comando = inserir(cls).values(linhas)
+        db.session.execute(comando.on_conflict_do_update(
+            index_elements=[cls.usuario_id, cls.granularidade, cls.inicio],
+            set_={
+                'conclusoes': cls.conclusoes + comando.excluded.conclusoes,
+                'pontos': cls.pontos + comando.excluded.pontos,
+                'xp': cls.xp + comando.excluded.xp,
+            }
+        ))
+    
+    @classmethod
+    def _somar_periodo(cls, linha):
+        """
+        Função auxiliar para bancos sem INSERT ... ON CONFLICT: soma com UPDATE e, se o período
+        ainda não existe, insere; um INSERT concorrente que vença a corrida leva a somar de novo
+        """
+        chave = (cls.usuario_id == linha['usuario_id'], cls.granularidade == linha['granularidade'],
+                 cls.inicio == linha['inicio'])
+        somar = update(cls).where(*chave).values(
+            conclusoes=cls.conclusoes + linha['conclusoes'],
+            pontos=cls.pontos + linha['pontos'],
+            xp=cls.xp + linha['xp'],
+        )
+        if db.session.execute(somar).rowcount:
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(cls).values(linha))
+        except IntegrityError:
+            db.session.execute(somar)
+    
+    @classmethod
+    def ajustar_pontos(cls, usuario_id, dia, diferenca):
+        """Ajusta os pontos dos períodos que contêm o dia de uma conclusão reavaliada"""
+        for granularidade in cls.GRANULARIDADES:
+            db.session.execute(
+                update(cls).where(
+                    cls.usuario_id == usuario_id,
+                    cls.granularidade == granularidade,
+                    cls.inicio == cls.inicio_periodo(dia, granularidade)
+                ).values(pontos=cls.pontos + diferenca)
+            )
 
 class Avaliacao(db.Model):
     __tablename__ = 'avaliacoes'
+    __table_args__ = (
+        db.Index('uq_avaliacoes_usuario_id_cliente', 'usuario_id', 'id_cliente', unique=True),
+        # Avaliações do usuário da mais recente para a mais antiga (paginação do perfil)
+        db.Index('ix_avaliacoes_usuario_id', 'usuario_id', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
@@ -99,35 +395,102 @@ class Avaliacao(db.Model):
     # Armazenar as respostas do teste como JSON
     respostas = db.Column(db.JSON)
     
-    def calcular_medias_por_categoria(self):
+    # Identificador gerado pelo cliente na sincronização offline (evita gravar a mesma avaliação duas vezes)
+    id_cliente = db.Column(db.String(64))
+    
+    # Médias por categoria calculadas na submissão
+    medias = db.relationship('MediaCategoriaAvaliacao', backref='avaliacao', lazy='selectin',
+                             cascade='all, delete-orphan')
+    
+    # Campos serializáveis e a coluna de origem de cada um (None: calculado a partir das médias)
+    CAMPOS = {
+        'id': 'id',
+        'usuario_id': 'usuario_id',
+        'data': 'data',
+        'pontuacao': 'pontuacao',
+        'feedback': 'feedback',
+        'respostas': 'respostas',
+        'medias_por_categoria': None,
+    }
+    
+    @classmethod
+    def colunas(cls, campos):
+        """Retorna as colunas necessárias para serializar os campos informados"""
+        return [getattr(cls, cls.CAMPOS[campo]) for campo in campos if cls.CAMPOS[campo]]
+    
+    def definir_medias(self, medias_por_categoria):
+        """Substitui as médias armazenadas pelas informadas ({categoria: média})"""
+        self.medias = [
+            MediaCategoriaAvaliacao(categoria=categoria, media=media)
+            for categoria, media in medias_por_categoria.items()
+        ]
+    
+    def calcular_medias_por_categoria(self, categorias_por_pergunta=None):
+        """
+        Calcula a média das respostas por categoria. Sem um mapa explícito,
+        usa o catálogo de perguntas em cache.
+        """
         if not self.respostas:
             return {}
-            
-        perguntas = PerguntaTeste.query.all()
+        
+        if categorias_por_pergunta is None:
+            from app.catalogo import catalogo_perguntas
+            categorias_por_pergunta = catalogo_perguntas.obter().categorias_por_pergunta
+        return Avaliacao.medias_por_categoria(self.respostas, categorias_por_pergunta)
+    
+    @staticmethod
+    def medias_por_categoria(respostas, categorias_por_pergunta):
+        """Agrupa as respostas {id da pergunta: valor} por categoria e calcula a média de cada uma"""
         categorias = {}
         
-        for pergunta in perguntas:
-            if str(pergunta.id) in self.respostas:
-                if pergunta.categoria not in categorias:
-                    categorias[pergunta.categoria] = []
-                categorias[pergunta.categoria].append(self.respostas[str(pergunta.id)])
+        for pergunta_id, categoria in categorias_por_pergunta.items():
+            if pergunta_id in respostas:
+                if categoria not in categorias:
+                    categorias[categoria] = []
+                categorias[categoria].append(respostas[pergunta_id])
         
         return {
             categoria: sum(valores) / len(valores)
             for categoria, valores in categorias.items()
         }
     
-    def to_dict(self):
+    def obter_medias_por_categoria(self, categorias_por_pergunta=None):
+        """Retorna as médias armazenadas, calculando-as apenas para avaliações ainda não migradas"""
+        if self.medias:
+            return {media.categoria: media.media for media in self.medias}
+        return self.calcular_medias_por_categoria(categorias_por_pergunta)
+    
+    def to_dict(self, categorias_por_pergunta=None, campos=None):
+        if campos is not None:
+            dados = {}
+            for campo in campos:
+                if campo == 'medias_por_categoria':
+                    dados[campo] = self.obter_medias_por_categoria(categorias_por_pergunta)
+                else:
+                    dados[campo] = getattr(self, self.CAMPOS[campo])
+            return dados
+        
         return {
             'id': self.id,
             'usuario_id': self.usuario_id,
-            'data': self.data.isoformat(),
+            'data': self.data,
             'pontuacao': self.pontuacao,
             'feedback': self.feedback,
             'respostas': self.respostas,
-            'medias_por_categoria': self.calcular_medias_por_categoria()
+            'medias_por_categoria': self.obter_medias_por_categoria(categorias_por_pergunta)
         }
 
+class MediaCategoriaAvaliacao(db.Model):
+    """Média das respostas de uma avaliação em uma categoria do teste inicial"""
+    __tablename__ = 'medias_categoria_avaliacao'
+    __table_args__ = (
+        db.Index('ix_medias_categoria_avaliacao_categoria', 'categoria'),
+    )
+    
+    avaliacao_id = db.Column(db.Integer, db.ForeignKey('avaliacoes.id'), primary_key=True)
+    categoria = db.Column(db.String(100), primary_key=True)
+    media = db.Column(db.Float, nullable=False)
+
 class Desafio(db.Model):
     __tablename__ = 'desafios'
     
@@ -138,6 +501,7 @@ class Desafio(db.Model):
     status = db.Column(db.String(20), default='ativo')  # ativo, inativo
     data_criacao = db.Column(db.DateTime, default=datetime.now(timezone.utc))
     prazo = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc) + timedelta(days=7))
+    data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     
     # Perguntas do quiz relacionadas ao desafio
@@ -149,21 +513,53 @@ class Desafio(db.Model):
     # Relacionamentos
     resultados = db.relationship('Resultado', backref='desafio', lazy=True)
     
-    def to_dict(self):
+    # Campos serializáveis e a coluna de origem de cada um
+    CAMPOS = {
+        'desafio_id': 'id',
+        'titulo': 'titulo',
+        'descricao': 'descricao',
+        'video_url': 'video_url',
+        'status': 'status',
+        'data_criacao': 'data_criacao',
+        'prazo': 'prazo',
+        'perguntas': 'perguntas',
+        'desafio_pratico': 'desafio_pratico'
+    }
+    
+    # Projeção usada na listagem: deixa de fora as colunas JSON/texto pesadas
+    CAMPOS_LISTA = ('desafio_id', 'titulo', 'descricao', 'video_url', 'status', 'data_criacao', 'prazo')
+    
+    @classmethod
+    def colunas(cls, campos):
+        """Retorna as colunas necessárias para serializar os campos informados"""
+        return [getattr(cls, cls.CAMPOS[campo]) for campo in campos]
+    
+    def to_dict(self, campos=None):
+        if campos is not None:
+            return {campo: getattr(self, self.CAMPOS[campo]) for campo in campos}
+        
         return {
             'desafio_id': self.id,
             'titulo': self.titulo,
             'descricao': self.descricao,
             'video_url': self.video_url,
             'status': self.status,
-            'data_criacao': self.data_criacao.isoformat(),
-            'prazo': self.prazo.isoformat() if self.prazo else None,
+            'data_criacao': self.data_criacao,
+            'prazo': self.prazo,
             'perguntas': self.perguntas,
             'desafio_pratico': self.desafio_pratico
         }
 
 class Resultado(db.Model):
     __tablename__ = 'resultados'
+    __table_args__ = (
+        # Um único resultado por usuário e desafio; também atende buscas por (usuario_id, desafio_id)
+        db.Index('uq_resultados_usuario_desafio', 'usuario_id', 'desafio_id', unique=True),
+        # Listagens de resultados do usuário por status, ordenadas pela data de conclusão
+        db.Index('ix_resultados_usuario_status_conclusao', 'usuario_id', 'status', 'data_conclusao'),
+        # Resultados do usuário do mais recente para o mais antigo (paginação do perfil)
+        db.Index('ix_resultados_usuario_id', 'usuario_id', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
@@ -179,19 +575,51 @@ class Resultado(db.Model):
     # Pontuação obtida
     pontuacao = db.Column(db.Integer, default=0)
     
-    def to_dict(self):
+    # Identificador gerado pelo cliente para a última submissão sincronizada offline
+    id_cliente = db.Column(db.String(64))
+    
+    # Campos serializáveis (todos vêm de colunas com o mesmo nome)
+    CAMPOS = ('id', 'usuario_id', 'desafio_id', 'status', 'data_inicio', 'data_conclusao', 'pontuacao',
+              'respostas_quiz', 'resposta_pratica')
+    
+    @classmethod
+    def colunas(cls, campos):
+        """Retorna as colunas necessárias para serializar os campos informados"""
+        return [getattr(cls, campo) for campo in campos]
+    
+    def chave_versao(self):
+        """Valores que mudam sempre que o progresso exibido ao usuário muda"""
+        return (self.id, self.status, self.pontuacao, self.data_inicio, self.data_conclusao)
+    
+    def to_dict(self, campos=None):
+        if campos is not None:
+            return {campo: getattr(self, campo) for campo in campos}
+        
         return {
             'id': self.id,
             'usuario_id': self.usuario_id,
             'desafio_id': self.desafio_id,
             'status': self.status,
-            'data_inicio': self.data_inicio.isoformat(),
-            'data_conclusao': self.data_conclusao.isoformat() if self.data_conclusao else None,
+            'data_inicio': self.data_inicio,
+            'data_conclusao': self.data_conclusao,
             'pontuacao': self.pontuacao,
             'respostas_quiz': self.respostas_quiz,
             'resposta_pratica': self.resposta_pratica
         }
 
+class SubmissaoDesafio(db.Model):
+    """
+    Submissões de quiz já sincronizadas offline, uma por id_cliente. Permite reconhecer o reenvio
+    de qualquer submissão (não só da última gravada no resultado) sem aplicá-la de novo.
+    """
+    __tablename__ = 'submissoes_desafios'
+    
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), primary_key=True)
+    id_cliente = db.Column(db.String(64), primary_key=True)
+    desafio_id = db.Column(db.Integer, db.ForeignKey('desafios.id'), nullable=False)
+    pontuacao = db.Column(db.Integer)
+    data = db.Column(db.DateTime, default=datetime.utcnow)
+
 # Modelo para as perguntas do teste inicial
 class PerguntaTeste(db.Model):
     __tablename__ = 'perguntas_teste'
@@ -208,3 +636,23 @@ class PerguntaTeste(db.Model):
             'categoria': self.categoria,
             'ordem': self.ordem
         }
+
+class VersaoCatalogo(db.Model):
+    """Contador de versão de um catálogo, usado para invalidar caches em todos os workers"""
+    __tablename__ = 'versoes_catalogo'
+    
+    nome = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+    
+    @classmethod
+    def atual(cls, nome):
+        return db.session.query(cls.versao).filter_by(nome=nome).scalar() or 0
+    
+    @classmethod
+    def incrementar(cls, session, nome):
+        """Incrementa a versão de forma atômica dentro da transação corrente"""
+        resultado = session.execute(
+            update(cls).where(cls.nome == nome).values(versao=cls.versao + 1)
+        )
+        if resultado.rowcount == 0:
+            session.add(cls(nome=nome, versao=1))
@@ -0,0 +1,122 @@
+import cProfile
+import hashlib
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import current_app, g, request
+
+# Cabeçalho com o token assinado que pede o perfil de uma requisição
+CABECALHO_PERFIL = 'X-Perfil'
+
+def gerar_token(chave, caminho, validade=600):
+    """
+    Gera o token do cabeçalho X-Perfil para o caminho informado, válido por `validade` segundos
+    """
+    expira = int(time.time()) + validade
+    return f"{expira}.{_assinatura(chave, expira, caminho)}"
+
+def _assinatura(chave, expira, caminho):
+    return hmac.new(chave.encode(), f"{expira}:{caminho}".encode(), hashlib.sha256).hexdigest()
+
+def token_valido(token, chave, caminho):
+    try:
+        expira, assinatura = token.split('.', 1)
+        expira = int(expira)
+    except ValueError:
+        return False
+    return expira >= time.time() and hmac.compare_digest(assinatura, _assinatura(chave, expira, caminho))
+
+class AmostradorPilhas(threading.Thread):
+    """
+    Amostra periodicamente a pilha de uma thread e conta as pilhas no formato "collapsed"
+    (funções separadas por ';', da raiz para a folha), aceito pelo flamegraph.pl e pelo speedscope
+    """
+
+    def __init__(self, thread_id, intervalo):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            frame = sys._current_frames().get(self.thread_id)
+            pilha = []
+            while frame is not None:
+                codigo = frame.f_code
+                pilha.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                frame = frame.f_back
+            if pilha:
+                self.pilhas[';'.join(reversed(pilha))] += 1
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+def deve_perfilar():
+    """Perfila a requisição com token válido no cabeçalho ou sorteada pela taxa de amostragem"""
+    token = request.headers.get(CABECALHO_PERFIL)
+    chave = current_app.config['PERFIL_CHAVE']
+    if token and chave and token_valido(token, chave, request.path):
+        return True
+    return random.random() < current_app.config['PERFIL_AMOSTRAGEM']
+
+def iniciar_perfil():
+    if not deve_perfilar():
+        return
+
+    perfil = cProfile.Profile()
+    try:
+        perfil.enable()
+    except ValueError:
+        # Outro profiler já está ativo nesta thread
+        return
+    amostrador = AmostradorPilhas(threading.get_ident(), current_app.config['PERFIL_INTERVALO_MS'] / 1000)
+    amostrador.start()
+    g._perfil = (perfil, amostrador, time.perf_counter())
+
+def finalizar_perfil(exc=None):
+    dados = g.pop('_perfil', None)
+    if dados is None:
+        return
+
+    perfil, amostrador, inicio = dados
+    perfil.disable()
+    amostrador.parar()
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+
+    diretorio = current_app.config['PERFIL_DIRETORIO'] or os.path.join(current_app.instance_path, 'perfis')
+    os.makedirs(diretorio, exist_ok=True)
+    endpoint = re.sub(r'[^\w.-]', '_', request.endpoint or 'desconhecido')
+    nome = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{endpoint}-u{_usuario_atual()}-{duracao_ms:.0f}ms"
+    base = os.path.join(diretorio, nome)
+
+    perfil.dump_stats(f"{base}.pstats")
+    with open(f"{base}.collapsed", 'w') as arquivo:
+        for pilha, amostras in amostrador.pilhas.most_common():
+            arquivo.write(f"{pilha} {amostras}\n")
+    current_app.logger.info(f"Perfil de {request.method} {request.path} gravado em {base}.pstats/.collapsed")
+
+def _usuario_atual():
+    from flask_jwt_extended import get_jwt_identity
+    try:
+        return get_jwt_identity() or 'anonimo'
+    except RuntimeError:
+        # A requisição não passou pela verificação do token
+        return 'anonimo'
+
+def registrar_perfilador(app):
+    """
+    Registra os hooks de perfil apenas quando PERFIL_ATIVO está ligado; desligado, não há custo por requisição
+    """
+    if not app.config['PERFIL_ATIVO']:
+        return
+    app.before_request(iniciar_perfil)
+    app.teardown_request(finalizar_perfil)
@@ -0,0 +1,67 @@
+from sqlalchemy import func, select, text
+from app import db
+
+def consultas_frequentes():
+    """
+    Consultas usadas pelos endpoints mais acessados, com valores de exemplo
+    """
+    from datetime import date
+    from app.models import Resultado, ProgressoPeriodo
+
+    return [
+        ('resultado do usuário em um desafio',
+         select(Resultado).where(Resultado.usuario_id == 1, Resultado.desafio_id == 1).limit(1)),
+        ('desafios concluídos do usuário (progresso)',
+         select(Resultado).where(Resultado.usuario_id == 1, Resultado.status == 'concluído')
+         .order_by(Resultado.data_conclusao.asc())),
+        ('resultados do usuário (perfil)',
+         select(Resultado).where(Resultado.usuario_id == 1)),
+        ('progresso na página de desafios',
+         select(Resultado).where(Resultado.usuario_id == 1, Resultado.desafio_id.in_([1, 2, 3]))),
+        ('estatísticas do usuário',
+         select(func.count(Resultado.id), func.sum(Resultado.pontuacao), func.max(Resultado.data_conclusao))
+         .where(Resultado.usuario_id == 1, Resultado.status == 'concluído')),
+        ('série de progresso do usuário',
+         select(ProgressoPeriodo.inicio, ProgressoPeriodo.conclusoes, ProgressoPeriodo.pontos, ProgressoPeriodo.xp)
+         .where(ProgressoPeriodo.usuario_id == 1, ProgressoPeriodo.granularidade == 'dia',
+                ProgressoPeriodo.inicio.between(date(2024, 1, 1), date(2024, 1, 31)))),
+    ]
+
+def explicar(conexao, consulta):
+    """
+    Retorna as linhas do plano de execução da consulta no banco atual
+    """
+    sql = str(consulta.compile(dialect=conexao.dialect, compile_kwargs={'literal_binds': True}))
+
+    if conexao.dialect.name == 'sqlite':
+        return [linha[-1] for linha in conexao.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+    # Em tabelas pequenas o PostgreSQL prefere varrer a tabela; desabilitar a varredura
+    # sequencial mostra se existe um índice capaz de atender a consulta
+    conexao.execute(text("SET LOCAL enable_seqscan = off"))
+    return [linha[0] for linha in conexao.execute(text(f"EXPLAIN {sql}"))]
+
+def varre_tabela(plano, tabela='resultados'):
+    for linha in plano:
+        if linha.startswith(f"SCAN {tabela}") and 'USING' not in linha:
+            return True
+        if f"Seq Scan on {tabela}" in linha:
+            return True
+    return False
+
+def verificar_planos(echo=print):
+    """
+    Mostra o plano de cada consulta frequente. Retorna False se alguma varrer a tabela inteira.
+    """
+    ok = True
+    with db.engine.begin() as conexao:
+        for descricao, consulta in consultas_frequentes():
+            plano = explicar(conexao, consulta)
+            usa_indice = not varre_tabela(plano, consulta.get_final_froms()[0].name)
+            ok = ok and usa_indice
+
+            echo(f"[{'OK' if usa_indice else 'SEM ÍNDICE'}] {descricao}")
+            for linha in plano:
+                echo(f"    {linha}")
+
+    return ok
@@ -0,0 +1,90 @@
+import threading
+from app import db, metricas
+
+class GabaritoQuiz:
+    """
+    Gabarito compilado do quiz de um desafio: para cada pergunta, o índice da opção correta.
+
+    A pontuação é de 1 ponto por resposta correta. Respostas com índice inválido
+    (fora do intervalo, negativo ou não numérico) são consideradas erradas.
+    """
+
+    __slots__ = ('versao', 'chave', 'total')
+
+    def __init__(self, versao, perguntas):
+        self.versao = versao
+        chave = []
+        for pergunta in perguntas or []:
+            opcoes = pergunta.get('opcoes') or []
+            correta = pergunta.get('resposta_correta')
+            indice_correto = opcoes.index(correta) if correta in opcoes else -1
+            chave.append((str(pergunta['id']), indice_correto, len(opcoes)))
+        self.chave = tuple(chave)
+        self.total = len(self.chave)
+
+    @staticmethod
+    def indice_valido(valor, num_opcoes):
+        """Converte a resposta em um índice de opção, ou None se ela não for válida"""
+        if isinstance(valor, bool):
+            return None
+        if isinstance(valor, str) and valor.strip().lstrip('-').isdigit():
+            valor = int(valor)
+        if isinstance(valor, int) and 0 <= valor < num_opcoes:
+            return valor
+        return None
+
+    def corrigir(self, respostas):
+        """Retorna a pontuação de um conjunto de respostas {id da pergunta: índice da opção}"""
+        if not isinstance(respostas, dict):
+            return 0
+
+        pontuacao = 0
+        for pergunta_id, indice_correto, num_opcoes in self.chave:
+            if pergunta_id in respostas and \
+                    self.indice_valido(respostas[pergunta_id], num_opcoes) == indice_correto:
+                pontuacao += 1
+        return pontuacao
+
+    def corrigir_lote(self, lista_respostas):
+        """Corrige várias submissões de uma vez, na mesma ordem recebida"""
+        corrigir = self.corrigir
+        return [corrigir(respostas) for respostas in lista_respostas]
+
+class CacheGabaritos:
+    """
+    Gabaritos compilados por desafio, invalidados pela data de atualização do desafio
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._gabaritos = {}
+
+    def obter(self, desafio_id):
+        """Retorna o gabarito atual do desafio, ou None se o desafio não existir"""
+        from app.models import Desafio
+
+        versao = db.session.query(Desafio.data_atualizacao, Desafio.data_criacao).filter_by(id=desafio_id).first()
+        if not versao:
+            return None
+        versao = versao.data_atualizacao or versao.data_criacao
+
+        gabarito = self._gabaritos.get(desafio_id)
+        if gabarito is not None and gabarito.versao == versao:
+            metricas.registrar_cache('gabaritos', True)
+            return gabarito
+
+        metricas.registrar_cache('gabaritos', False)
+        perguntas = db.session.query(Desafio.perguntas).filter_by(id=desafio_id).scalar()
+        gabarito = GabaritoQuiz(versao, perguntas)
+        with self._lock:
+            self._gabaritos[desafio_id] = gabarito
+        return gabarito
+
+    def invalidar(self, desafio_id=None):
+        with self._lock:
+            if desafio_id is None:
+                self._gabaritos.clear()
+            else:
+                self._gabaritos.pop(desafio_id, None)
+
+gabaritos = CacheGabaritos()
@@ -0,0 +1,149 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+
+class IndiceRanking:
+    """
+    Ranking em memória: lista ordenada de (-pontos, usuario_id) e os pontos de cada usuário.
+
+    A posição de um usuário é 1 + a quantidade de usuários com mais pontos (empates dividem a
+    posição), encontrada por busca binária. Atualizar um usuário remove e reinsere sua chave.
+    """
+
+    def __init__(self):
+        self._chaves = []
+        self._pontos = {}
+
+    def __len__(self):
+        return len(self._chaves)
+
+    def reconstruir(self, pontos_por_usuario):
+        self._pontos = dict(pontos_por_usuario)
+        self._chaves = sorted((-pontos, usuario_id) for usuario_id, pontos in self._pontos.items())
+
+    def atualizar(self, usuario_id, pontos):
+        anterior = self._pontos.get(usuario_id)
+        if anterior == pontos:
+            return
+        if anterior is not None:
+            del self._chaves[bisect_left(self._chaves, (-anterior, usuario_id))]
+        self._pontos[usuario_id] = pontos
+        insort(self._chaves, (-pontos, usuario_id))
+
+    def pontos(self, usuario_id):
+        return self._pontos.get(usuario_id)
+
+    def _posicao_da_chave(self, chave):
+        # Usuários com a mesma pontuação dividem a posição do primeiro deles
+        return bisect_left(self._chaves, (chave[0],)) + 1
+
+    def _entrada(self, indice):
+        chave = self._chaves[indice]
+        return {'posicao': self._posicao_da_chave(chave), 'usuario_id': chave[1], 'pontos': -chave[0]}
+
+    def posicao(self, usuario_id):
+        """Posição e pontos do usuário, ou None se ele não estiver no ranking"""
+        pontos = self._pontos.get(usuario_id)
+        if pontos is None:
+            return None
+        return {'posicao': self._posicao_da_chave((-pontos, usuario_id)), 'usuario_id': usuario_id, 'pontos': pontos}
+
+    def pagina(self, inicio, limite):
+        return [self._entrada(indice) for indice in range(inicio, min(inicio + limite, len(self._chaves)))]
+
+    def vizinhos(self, usuario_id, quantidade):
+        """Entradas ao redor do usuário: até `quantidade` acima e abaixo dele"""
+        pontos = self._pontos.get(usuario_id)
+        if pontos is None:
+            return []
+        indice = bisect_left(self._chaves, (-pontos, usuario_id))
+        return self.pagina(max(indice - quantidade, 0), 2 * quantidade + 1 - max(quantidade - indice, 0))
+
+class Rankings:
+    """
+    Rankings globais por XP total e por desafios concluídos.
+
+    Os índices são montados a partir do banco no primeiro uso e remontados a cada RANKING_TTL
+    segundos (o que traz as alterações feitas por outros workers). As alterações feitas neste
+    processo são aplicadas incrementalmente quando a transação é confirmada.
+    """
+
+    TIPOS = ('xp', 'desafios')
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._indices = None
+        self._construido_em = 0.0
+
+    def _consultar_pontos(self):
+        from app.models import Usuario, EstatisticaUsuario
+
+        xp = dict(db.session.query(Usuario.id, Usuario.xp_total))
+        desafios = dict.fromkeys(xp, 0)
+        desafios.update(db.session.query(EstatisticaUsuario.usuario_id, EstatisticaUsuario.desafios_concluidos))
+        return {'xp': xp, 'desafios': desafios}
+
+    def _indice(self, tipo):
+        """Índice do ranking `tipo`, montando-o a partir do banco se ainda não existir ou tiver expirado"""
+        if self._indices is None or time.monotonic() - self._construido_em >= current_app.config['RANKING_TTL']:
+            indices = {}
+            for nome, pontos in self._consultar_pontos().items():
+                indices[nome] = IndiceRanking()
+                indices[nome].reconstruir(pontos)
+            self._indices = indices
+            self._construido_em = time.monotonic()
+        return self._indices[tipo]
+
+    def total(self, tipo):
+        with self._lock:
+            return len(self._indice(tipo))
+
+    def pagina(self, tipo, inicio, limite):
+        with self._lock:
+            return self._indice(tipo).pagina(inicio, limite)
+
+    def posicao(self, tipo, usuario_id, pontos):
+        """Posição do usuário com seus pontos atuais (lidos do banco pela requisição)"""
+        with self._lock:
+            indice = self._indice(tipo)
+            indice.atualizar(usuario_id, pontos)
+            return indice.posicao(usuario_id)
+
+    def vizinhos(self, tipo, usuario_id, quantidade):
+        with self._lock:
+            return self._indice(tipo).vizinhos(usuario_id, quantidade)
+
+    def aplicar(self, alteracoes):
+        """Aplica alterações {(tipo, usuario_id): pontos} aos índices já montados"""
+        with self._lock:
+            if self._indices is None:
+                return
+            for (tipo, usuario_id), pontos in alteracoes.items():
+                self._indices[tipo].atualizar(usuario_id, pontos)
+
+    def invalidar(self):
+        with self._lock:
+            self._indices = None
+
+rankings = Rankings()
+
+def registrar_alteracao(tipo, usuario_id, pontos):
+    """
+    Agenda a atualização do ranking para quando a transação atual for confirmada
+    """
+    if usuario_id is not None:
+        db.session.info.setdefault('ranking_alteracoes', {})[(tipo, usuario_id)] = pontos
+
+@event.listens_for(Session, 'after_commit')
+def _aplicar_alteracoes_ranking(session):
+    alteracoes = session.info.pop('ranking_alteracoes', None)
+    if alteracoes:
+        rankings.aplicar(alteracoes)
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_alteracoes_ranking(session):
+    session.info.pop('ranking_alteracoes', None)
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import Usuario, Avaliacao, PerguntaTeste
+from app.models import Usuario, Avaliacao
+from app.catalogo import catalogo_perguntas
+from app.http_cache import etag_forte, resposta_condicional
 from app import db
 
 assessment_bp = Blueprint('assessment', __name__)
@@ -8,15 +10,11 @@ assessment_bp = Blueprint('assessment', __name__)
 @assessment_bp.route('/perguntas', methods=['GET'])
 @jwt_required()
 def obter_perguntas():
-    perguntas = PerguntaTeste.query.order_by(PerguntaTeste.ordem).all()
-    return jsonify({
-        'perguntas': [{
-            'id': p.id,
-            'texto': p.texto,
-            'categoria': p.categoria,
-            'ordem': p.ordem
-        } for p in perguntas]
-    }), 200
+    catalogo = catalogo_perguntas.obter()
+    return resposta_condicional(
+        etag_forte('perguntas-teste', catalogo.versao),
+        lambda: (jsonify({'perguntas': catalogo.payload}), 200)
+    )
 
 @assessment_bp.route('/submeter', methods=['POST'])
 @jwt_required()
@@ -40,17 +38,12 @@ def submeter_avaliacao():
     respostas = data['respostas']
     
     # Verificar se todas as perguntas foram respondidas
-    perguntas = PerguntaTeste.query.all()
-    ids_perguntas = [str(p.id) for p in perguntas]
+    catalogo = catalogo_perguntas.obter()
+    erro = validar_respostas(respostas, catalogo)
+    if erro:
+        return jsonify({'message': erro}), 400
     
-    for id_pergunta in ids_perguntas:
-        if id_pergunta not in respostas:
-            return jsonify({'message': f'Resposta para a pergunta {id_pergunta} não foi fornecida'}), 400
-    
-    # Calcular pontuação (média das respostas)
-    # Considerando que as respostas são valores de 1 a 5 (escala Likert)
-    valores_respostas = [int(valor) for valor in respostas.values()]
-    pontuacao = sum(valores_respostas) / len(valores_respostas)
+    pontuacao = calcular_pontuacao(respostas)
     
     # Gerar feedback com base na pontuação
     feedback = gerar_feedback(pontuacao)
@@ -62,6 +55,9 @@ def submeter_avaliacao():
         feedback=feedback,
         respostas=respostas
     )
+    nova_avaliacao.definir_medias(
+        nova_avaliacao.calcular_medias_por_categoria(catalogo.categorias_por_pergunta)
+    )
     
     db.session.add(nova_avaliacao)
     db.session.commit()
@@ -84,6 +80,27 @@ def obter_historico():
         'avaliacoes': [avaliacao.to_dict() for avaliacao in avaliacoes]
     }), 200
 
+def validar_respostas(respostas, catalogo):
+    """
+    Função auxiliar que retorna a mensagem de erro das respostas, ou None se todas as perguntas foram respondidas
+    """
+    if not isinstance(respostas, dict):
+        return 'Respostas devem ser um objeto {id_pergunta: valor_resposta}'
+    
+    for id_pergunta in catalogo.ordem:
+        if id_pergunta not in respostas:
+            return f'Resposta para a pergunta {id_pergunta} não foi fornecida'
+    
+    return None
+
+def calcular_pontuacao(respostas):
+    """
+    Função auxiliar para calcular a pontuação (média das respostas)
+    Considerando que as respostas são valores de 1 a 5 (escala Likert)
+    """
+    valores_respostas = [int(valor) for valor in respostas.values()]
+    return sum(valores_respostas) / len(valores_respostas)
+
 def gerar_feedback(pontuacao):
     """
     Função auxiliar para gerar feedback com base na pontuação
@@ -1,10 +1,12 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import (
-    create_access_token, create_refresh_token,
+    create_refresh_token,
     jwt_required, get_jwt_identity
 )
 from app.models import Usuario
-from app import db
+from app.identidade import criar_token_acesso, identidade_atual, modo_claims
+from app.senhas import SenhasSobrecarregadas
+from app import db, metricas
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -34,22 +36,29 @@ def login():
         usuario = Usuario.query.filter_by(email=data.get('email')).first()
         
         if not usuario:
+            metricas.logins.labels(resultado='falha').inc()
             return jsonify({
                 'message': 'Email ou senha inválidos.'
             }), 401
         
         if not usuario.verificar_senha(data.get('senha')):
+            metricas.logins.labels(resultado='falha').inc()
             return jsonify({
                 'message': 'Email ou senha inválidos.'
             }), 401
         
+        # Atualizar o hash se ele foi gerado com um método ou custo antigo
+        if usuario.atualizar_hash_senha(data.get('senha')):
+            db.session.commit()
+        
         # Criar tokens JWT
-        access_token = create_access_token(identity=str(usuario.id))
+        access_token = criar_token_acesso(usuario)
         refresh_token = create_refresh_token(identity=str(usuario.id))
         
         user_data = usuario.to_dict()
         print("User data:", user_data)  # Debug log
         
+        metricas.logins.labels(resultado='sucesso').inc()
         return jsonify({
             'message': 'Login realizado com sucesso',
             'access_token': access_token,
@@ -57,6 +66,9 @@ def login():
             'usuario': user_data
         }), 200
         
+    except SenhasSobrecarregadas:
+        metricas.logins.labels(resultado='recusado').inc()
+        raise
     except Exception as e:
         print(f"Error in login endpoint: {str(e)}")  # Error log
         import traceback
@@ -78,7 +90,13 @@ def refresh():
       - Novo token de acesso JWT
     """
     current_user_id = get_jwt_identity()
-    new_access_token = create_access_token(identity=current_user_id)
+    usuario = Usuario.query.get(int(current_user_id))
+    
+    if not usuario:
+        return jsonify({'message': 'Usuário não encontrado'}), 404
+    
+    # O novo token leva as claims atualizadas do perfil
+    new_access_token = criar_token_acesso(usuario)
     
     return jsonify({
         'message': 'Token renovado com sucesso',
@@ -119,7 +137,7 @@ def registro():
     db.session.commit()
     
     # Criar tokens JWT
-    access_token = create_access_token(identity=str(novo_usuario.id))
+    access_token = criar_token_acesso(novo_usuario)
     refresh_token = create_refresh_token(identity=str(novo_usuario.id))
     
     return jsonify({
@@ -140,6 +158,17 @@ def verificar_token():
     Retorna:
       - Status da verificação
     """
+    # Modo leve: responder a partir das claims do token
+    if modo_claims() != 'desligado':
+        identidade = identidade_atual()
+        if not identidade:
+            return jsonify({'message': 'Usuário não encontrado'}), 404
+        
+        return jsonify({
+            'message': 'Token válido',
+            'usuario': identidade
+        }), 200
+    
     current_user_id = get_jwt_identity()
     usuario = Usuario.query.get(current_user_id)
     
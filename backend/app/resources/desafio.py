@@ -1,7 +1,14 @@
-from flask import Blueprint, request, jsonify
+import base64
+import binascii
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import and_, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only
 from datetime import datetime, timezone
-from app.models import Usuario, Desafio, Resultado
+from app.models import Usuario, Desafio, Resultado, EstatisticaUsuario, ProgressoPeriodo, XP_POR_DESAFIO
+from app.http_cache import etag_forte, resposta_condicional
+from app.pontuacao import gabaritos
 from app import db
 
 desafio_bp = Blueprint('desafio', __name__)
@@ -10,42 +17,83 @@ desafio_bp = Blueprint('desafio', __name__)
 @jwt_required()
 def listar_desafios():
     """
-    Endpoint para listar todos os desafios disponíveis
+    Endpoint para listar os desafios disponíveis, paginados por cursor
     ---
     Requer:
       - Token de acesso JWT válido
     Parâmetros de consulta:
       - status: Filtrar por status (ativo, inativo)
+      - limite: Quantidade de desafios por página (padrão DESAFIOS_POR_PAGINA)
+      - cursor: Valor de `proximo_cursor` da página anterior
+      - fields: Lista de campos separados por vírgula (padrão: projeção de listagem,
+        sem `perguntas` e `desafio_pratico`)
     Retorna:
-      - Lista de desafios
+      - Lista de desafios e o cursor da próxima página
     """
     current_user_id = get_jwt_identity()
     
+    # Campos solicitados
+    if request.args.get('fields'):
+        campos = [campo.strip() for campo in request.args['fields'].split(',') if campo.strip()]
+        invalidos = [campo for campo in campos if campo not in Desafio.CAMPOS]
+        if invalidos:
+            return jsonify({'message': f'Campos inválidos: {", ".join(invalidos)}'}), 400
+    else:
+        campos = list(Desafio.CAMPOS_LISTA)
+    
+    # Tamanho da página
+    try:
+        limite = int(request.args.get('limite', current_app.config['DESAFIOS_POR_PAGINA']))
+    except ValueError:
+        return jsonify({'message': 'Parâmetro limite inválido'}), 400
+    limite = max(1, min(limite, current_app.config['DESAFIOS_POR_PAGINA_MAX']))
+    
+    # Carregar apenas as colunas necessárias (id e data_criacao sustentam o cursor)
+    colunas = Desafio.colunas(set(campos) | {'desafio_id', 'data_criacao'})
+    query = Desafio.query.options(load_only(*colunas))
+    
     # Filtrar por status se fornecido
     status = request.args.get('status')
-    query = Desafio.query
-    
     if status:
         query = query.filter_by(status=status)
     
-    # Obter todos os desafios
-    desafios = query.order_by(Desafio.data_criacao.desc()).all()
-    
-    # Obter resultados do usuário para cada desafio
-    resultados = {r.desafio_id: r for r in Resultado.query.filter_by(usuario_id=int(current_user_id)).all()}
+    # Continuar a partir do último desafio da página anterior
+    if request.args.get('cursor'):
+        try:
+            data_criacao, desafio_id = decodificar_cursor(request.args['cursor'])
+        except ValueError:
+            return jsonify({'message': 'Cursor inválido'}), 400
+        query = query.filter(or_(
+            Desafio.data_criacao < data_criacao,
+            and_(Desafio.data_criacao == data_criacao, Desafio.id < desafio_id)
+        ))
+    
+    desafios = query.order_by(Desafio.data_criacao.desc(), Desafio.id.desc()).limit(limite + 1).all()
+    proximo_cursor = None
+    if len(desafios) > limite:
+        desafios = desafios[:limite]
+        proximo_cursor = codificar_cursor(desafios[-1])
+    
+    # Obter resultados do usuário apenas para os desafios desta página
+    resultados = {}
+    if desafios:
+        resultados = {r.desafio_id: r for r in Resultado.query.filter(
+            Resultado.usuario_id == int(current_user_id),
+            Resultado.desafio_id.in_([desafio.id for desafio in desafios])
+        )}
     
     # Preparar dados para retorno
     desafios_data = []
     for desafio in desafios:
-        desafio_dict = desafio.to_dict()
+        desafio_dict = desafio.to_dict(campos)
         
         # Adicionar informações sobre o progresso do usuário neste desafio
         if desafio.id in resultados:
             resultado = resultados[desafio.id]
             desafio_dict['progresso'] = {
                 'status': resultado.status,
-                'data_inicio': resultado.data_inicio.isoformat(),
-                'data_conclusao': resultado.data_conclusao.isoformat() if resultado.data_conclusao else None,
+                'data_inicio': resultado.data_inicio,
+                'data_conclusao': resultado.data_conclusao,
                 'pontuacao': resultado.pontuacao
             }
         else:
@@ -55,9 +103,27 @@ def listar_desafios():
     
     return jsonify({
         'message': 'Desafios obtidos com sucesso',
-        'desafios': desafios_data
+        'desafios': desafios_data,
+        'proximo_cursor': proximo_cursor
     }), 200
 
+def codificar_cursor(desafio):
+    """
+    Função auxiliar para gerar o cursor opaco que aponta para depois de um desafio
+    """
+    valor = f"{desafio.data_criacao.isoformat()}|{desafio.id}"
+    return base64.urlsafe_b64encode(valor.encode()).decode()
+
+def decodificar_cursor(cursor):
+    """
+    Função auxiliar para ler um cursor gerado por codificar_cursor. Levanta ValueError se inválido.
+    """
+    try:
+        data_criacao, desafio_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(data_criacao), int(desafio_id)
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(str(e))
+
 @desafio_bp.route('/<int:desafio_id>', methods=['GET'])
 @jwt_required()
 def obter_desafio(desafio_id):
@@ -73,33 +139,38 @@ def obter_desafio(desafio_id):
     """
     current_user_id = get_jwt_identity()
     
-    # Obter o desafio
-    desafio = Desafio.query.get(desafio_id)
+    # Obter apenas a versão do desafio; o desafio completo só é carregado se o cliente não tiver a versão atual
+    atualizado_em = versao_desafio(desafio_id)
     
-    if not desafio:
+    if not atualizado_em:
         return jsonify({'message': 'Desafio não encontrado'}), 404
     
     # Obter resultado do usuário para este desafio
     resultado = Resultado.query.filter_by(usuario_id=int(current_user_id), desafio_id=desafio_id).first()
     
-    # Preparar dados para retorno
-    desafio_dict = desafio.to_dict()
-    
-    # Adicionar informações sobre o progresso do usuário neste desafio
-    if resultado:
-        desafio_dict['progresso'] = {
-            'desafioConcluido': resultado.status == 'concluído',
-            'dataInicio': resultado.data_inicio.isoformat(),
-            'dataConclusao': resultado.data_conclusao.isoformat() if resultado.data_conclusao else None,
-            'pontuacaoQuiz': resultado.pontuacao
-        }
-    else:
-        desafio_dict['progresso'] = None
+    def gerar():
+        # Preparar dados para retorno
+        desafio_dict = Desafio.query.get(desafio_id).to_dict()
+        
+        # Adicionar informações sobre o progresso do usuário neste desafio
+        if resultado:
+            desafio_dict['progresso'] = {
+                'desafioConcluido': resultado.status == 'concluído',
+                'dataInicio': resultado.data_inicio,
+                'dataConclusao': resultado.data_conclusao,
+                'pontuacaoQuiz': resultado.pontuacao
+            }
+        else:
+            desafio_dict['progresso'] = None
+        
+        return jsonify({
+            'message': 'Desafio obtido com sucesso',
+            'desafio': desafio_dict
+        }), 200
     
-    return jsonify({
-        'message': 'Desafio obtido com sucesso',
-        'desafio': desafio_dict
-    }), 200
+    etag = etag_forte('desafio', desafio_id, atualizado_em, current_user_id,
+                      resultado.chave_versao() if resultado else None)
+    return resposta_condicional(etag, gerar)
 
 @desafio_bp.route('/<int:desafio_id>/iniciar', methods=['POST'])
 @jwt_required()
@@ -140,7 +211,16 @@ def iniciar_desafio(desafio_id):
     )
     
     db.session.add(novo_resultado)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Outra requisição iniciou o mesmo desafio ao mesmo tempo
+        db.session.rollback()
+        resultado_existente = Resultado.query.filter_by(usuario_id=int(current_user_id), desafio_id=desafio_id).first()
+        return jsonify({
+            'message': 'Desafio já iniciado anteriormente',
+            'resultado': resultado_existente.to_dict()
+        }), 200
     
     return jsonify({
         'message': 'Desafio iniciado com sucesso',
@@ -159,54 +239,69 @@ def submeter_desafio(desafio_id):
             'error': 'MISSING_ANSWERS'
         }), 400
     
-    desafio = Desafio.query.get(desafio_id)
-    if not desafio:
+    if not isinstance(data['respostasQuiz'], dict):
+        return jsonify({
+            'message': 'Respostas do quiz devem ser um objeto {id da pergunta: índice da opção}',
+            'error': 'INVALID_ANSWERS'
+        }), 400
+    
+    gabarito = gabaritos.obter(desafio_id)
+    if not gabarito:
         return jsonify({
             'message': 'Desafio não encontrado',
             'error': 'CHALLENGE_NOT_FOUND'
         }), 404
     
+    respostas_quiz = data['respostasQuiz']
+    
+    # Calcular pontuação - 1 ponto por resposta correta
+    pontuacao = gabarito.corrigir(respostas_quiz)
+    
+    resultado = aplicar_submissao(int(current_user_id), desafio_id, respostas_quiz, pontuacao)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Outra requisição criou o resultado do mesmo desafio ao mesmo tempo: a submissão é aplicada sobre ele
+        db.session.rollback()
+        resultado = aplicar_submissao(int(current_user_id), desafio_id, respostas_quiz, pontuacao)
+        db.session.commit()
+    
+    return jsonify({
+        'message': 'Respostas submetidas com sucesso',
+        'resultado': {
+            'pontuacao': pontuacao,
+            'total': gabarito.total,
+            'concluido': resultado.status == 'concluído'
+        }
+    }), 200
+
+def aplicar_submissao(usuario_id, desafio_id, respostas_quiz, pontuacao):
+    """
+    Função auxiliar que grava as respostas do quiz no resultado do usuário, criando-o se necessário
+    """
     # Obter ou criar resultado
-    resultado = Resultado.query.filter_by(
-        usuario_id=int(current_user_id), 
-        desafio_id=desafio_id
-    ).first()
+    resultado = Resultado.query.filter_by(usuario_id=usuario_id, desafio_id=desafio_id).first()
     
     if not resultado:
         resultado = Resultado(
-            usuario_id=int(current_user_id),
+            usuario_id=usuario_id,
             desafio_id=desafio_id,
             status='em_andamento'
         )
         db.session.add(resultado)
     
-    respostas_quiz = data['respostasQuiz']
-    
-    # Calcular pontuação - 10 pontos por resposta correta
-    pontuacao = 0
-    for pergunta in desafio.perguntas:
-        pergunta_id = str(pergunta['id'])
-        if pergunta_id in respostas_quiz:
-            resposta_usuario_indice = respostas_quiz[pergunta_id]
-            opcoes = pergunta['opcoes']
-            resposta_usuario = opcoes[resposta_usuario_indice]
-            if resposta_usuario == pergunta['resposta_correta']:
-                pontuacao += 1
+    # Manter o total de pontos do usuário coerente se o desafio já foi concluído
+    if resultado.status == 'concluído':
+        diferenca = pontuacao - (resultado.pontuacao or 0)
+        usuario = Usuario.query.get(usuario_id)
+        usuario.obter_estatisticas().ajustar_pontuacao(diferenca)
+        if diferenca and resultado.data_conclusao:
+            ProgressoPeriodo.ajustar_pontos(usuario.id, resultado.data_conclusao.date(), diferenca)
     
     # Atualizar resultado
-    resultado.respostasQuiz = respostas_quiz
+    resultado.respostas_quiz = respostas_quiz
     resultado.pontuacao = pontuacao
-    
-    db.session.commit()
-    
-    return jsonify({
-        'message': 'Respostas submetidas com sucesso',
-        'resultado': {
-            'pontuacao': pontuacao,
-            'total': len(desafio.perguntas),
-            'concluido': resultado.status == 'concluído'
-        }
-    }), 200
+    return resultado
 
 @desafio_bp.route('/destaque', methods=['GET'])
 @jwt_required()
@@ -221,38 +316,58 @@ def obter_desafio_destaque():
     """
     current_user_id = get_jwt_identity()
     
-    # Obter o desafio mais recente com status ativo
-    desafio = Desafio.query.filter_by(status='ativo').order_by(Desafio.data_criacao.desc()).first()
+    # Obter a versão do desafio mais recente com status ativo
+    destaque = db.session.query(Desafio.id, Desafio.data_atualizacao, Desafio.data_criacao).filter_by(
+        status='ativo'
+    ).order_by(Desafio.data_criacao.desc()).first()
     
-    if not desafio:
+    if not destaque:
         return jsonify({'message': 'Nenhum desafio em destaque disponível'}), 404
     
     # Obter resultado do usuário para este desafio
-    resultado = Resultado.query.filter_by(usuario_id=int(current_user_id), desafio_id=desafio.id).first()
-    
-    # Preparar dados para retorno
-    desafio_dict = desafio.to_dict()
+    resultado = Resultado.query.filter_by(usuario_id=int(current_user_id), desafio_id=destaque.id).first()
     
-    # Adicionar informações sobre o progresso do usuário neste desafio
-    if resultado:
-        desafio_dict['progresso'] = resultado.to_dict()
-    else:
-        desafio_dict['progresso'] = None
+    def gerar():
+        # Preparar dados para retorno
+        desafio_dict = Desafio.query.get(destaque.id).to_dict()
+        
+        # Adicionar informações sobre o progresso do usuário neste desafio
+        if resultado:
+            desafio_dict['progresso'] = resultado.to_dict()
+        else:
+            desafio_dict['progresso'] = None
+        
+        return jsonify({
+            'message': 'Desafio em destaque obtido com sucesso',
+            'desafio': desafio_dict
+        }), 200
     
-    return jsonify({
-        'message': 'Desafio em destaque obtido com sucesso',
-        'desafio': desafio_dict
-    }), 200
+    etag = etag_forte('destaque', destaque.id, destaque.data_atualizacao or destaque.data_criacao,
+                      current_user_id, resultado.chave_versao() if resultado else None)
+    return resposta_condicional(etag, gerar)
 
 @desafio_bp.route('/<int:desafio_id>/perguntas', methods=['GET'])
 @jwt_required()
 def obter_perguntas(desafio_id):
-    desafio = Desafio.query.get(desafio_id)
-    if not desafio:
+    atualizado_em = versao_desafio(desafio_id)
+    if not atualizado_em:
         return jsonify({'message': 'Desafio não encontrado'}), 404
     
-    perguntas = desafio.perguntas  # já é uma lista/dict, não precisa .to_dict()
-    return jsonify({'perguntas': perguntas}), 200
+    def gerar():
+        perguntas = db.session.query(Desafio.perguntas).filter_by(id=desafio_id).scalar()  # já é uma lista/dict, não precisa .to_dict()
+        return jsonify({'perguntas': perguntas}), 200
+    
+    return resposta_condicional(etag_forte('perguntas', desafio_id, atualizado_em), gerar,
+                                ultima_modificacao=atualizado_em)
+
+def versao_desafio(desafio_id):
+    """
+    Função auxiliar que retorna a data da última alteração do desafio, ou None se ele não existir
+    """
+    versao = db.session.query(Desafio.data_atualizacao, Desafio.data_criacao).filter_by(id=desafio_id).first()
+    if not versao:
+        return None
+    return versao.data_atualizacao or versao.data_criacao
 
 @desafio_bp.route('/<int:desafio_id>/resultado-quiz', methods=['GET'])
 @jwt_required()
@@ -276,38 +391,36 @@ def concluir_desafio(desafio_id):
     """
     Endpoint para marcar um desafio como concluído
     """
-    current_user_id = get_jwt_identity()
-    resultado = Resultado.query.filter_by(usuario_id=current_user_id, desafio_id=desafio_id).first()
-    if not resultado:
-        return jsonify({'message': 'Desafio não iniciado'}), 400
+    current_user_id = int(get_jwt_identity())
+    data_conclusao = datetime.utcnow()
 
-    if resultado.status == 'concluído':
-        return jsonify({'message': 'Desafio já foi concluído anteriormente'}), 200
+    # A mudança de status só acontece se o desafio ainda não estiver concluído: entre requisições
+    # simultâneas, apenas uma altera a linha e concede o XP
+    concluido = db.session.execute(
+        update(Resultado).where(
+            Resultado.usuario_id == current_user_id,
+            Resultado.desafio_id == desafio_id,
+            Resultado.status != 'concluído'
+        ).values(status='concluído', data_conclusao=data_conclusao)
+        .returning(Resultado.pontuacao)
+        .execution_options(synchronize_session=False)
+    ).first()
 
-    resultado.status = 'concluído'
-    resultado.data_conclusao = datetime.utcnow()
+    if concluido is None:
+        iniciado = db.session.query(Resultado.id).filter_by(usuario_id=current_user_id, desafio_id=desafio_id).first()
+        if not iniciado:
+            return jsonify({'message': 'Desafio não iniciado'}), 400
+        return jsonify({'message': 'Desafio já foi concluído anteriormente'}), 200
 
-    # Adicionar XP ao usuário
-    usuario = Usuario.query.get(current_user_id)
-    if usuario:
-        usuario.adicionar_xp(10)  # Defina o valor de XP por desafio concluído (exemplo: 50)
-        db.session.add(usuario)
+    # Adicionar XP ao usuário e atualizar suas estatísticas e a série de progresso na mesma transação
+    Usuario.conceder_xp(current_user_id, XP_POR_DESAFIO)
+    if not EstatisticaUsuario.registrar_conclusao(current_user_id, data_conclusao, concluido.pontuacao):
+        # Sem estatísticas ainda: reconstruí-las a partir dos resultados já inclui esta conclusão
+        usuario = db.session.get(Usuario, current_user_id)
+        if usuario:
+            usuario.obter_estatisticas()
+    ProgressoPeriodo.registrar_conclusao(current_user_id, data_conclusao, concluido.pontuacao, XP_POR_DESAFIO)
 
     db.session.commit()
 
     return jsonify({'message': 'Desafio concluído com sucesso'}), 200
-
-
-def calcular_pontuacao_quiz(respostasQuiz, perguntas):
-    """
-    Função auxiliar para calcular a pontuação do quiz
-    """
-    # Implementação simplificada: cada resposta correta vale 10 pontos
-    pontuacaoQuiz = 0
-    
-    for pergunta in perguntas:
-        id_pergunta = str(pergunta['id'])
-        if id_pergunta in respostasQuiz and respostasQuiz[id_pergunta] == pergunta['resposta_correta']:
-            pontuacaoQuiz += 10
-    
-    return pontuacaoQuiz
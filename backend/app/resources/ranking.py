@@ -0,0 +1,110 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models import Usuario
+from app.ranking import rankings
+from app import db
+
+ranking_bp = Blueprint('ranking', __name__)
+
+@ranking_bp.route('', methods=['GET'])
+@jwt_required()
+def obter_ranking():
+    """
+    Endpoint para obter uma página do ranking global
+    ---
+    Requer:
+      - Token de acesso JWT válido
+    Parâmetros de consulta:
+      - tipo: 'xp' (XP total, padrão) ou 'desafios' (desafios concluídos)
+      - pagina: Número da página, a partir de 1 (padrão 1)
+      - limite: Usuários por página (padrão RANKING_POR_PAGINA)
+    Retorna:
+      - Usuários da página com posição e pontos, e o total de usuários no ranking
+    """
+    tipo = request.args.get('tipo', 'xp')
+    if tipo not in rankings.TIPOS:
+        return jsonify({'message': "Parâmetro tipo deve ser 'xp' ou 'desafios'"}), 400
+
+    try:
+        pagina = max(1, int(request.args.get('pagina', 1)))
+        limite = int(request.args.get('limite', current_app.config['RANKING_POR_PAGINA']))
+    except ValueError:
+        return jsonify({'message': 'Parâmetros pagina e limite devem ser números inteiros'}), 400
+    limite = max(1, min(limite, current_app.config['RANKING_POR_PAGINA_MAX']))
+
+    entradas = rankings.pagina(tipo, (pagina - 1) * limite, limite)
+
+    return jsonify({
+        'message': 'Ranking obtido com sucesso',
+        'tipo': tipo,
+        'pagina': pagina,
+        'limite': limite,
+        'total': rankings.total(tipo),
+        'ranking': completar_entradas(entradas)
+    }), 200
+
+@ranking_bp.route('/me', methods=['GET'])
+@jwt_required()
+def obter_minha_posicao():
+    """
+    Endpoint para obter a posição do usuário autenticado no ranking
+    ---
+    Requer:
+      - Token de acesso JWT válido
+    Parâmetros de consulta:
+      - tipo: 'xp' (XP total, padrão) ou 'desafios' (desafios concluídos)
+      - vizinhos: Quantidade de usuários acima e abaixo a incluir (padrão 0)
+    Retorna:
+      - Posição e pontos do usuário, total de usuários no ranking e os vizinhos
+    """
+    tipo = request.args.get('tipo', 'xp')
+    if tipo not in rankings.TIPOS:
+        return jsonify({'message': "Parâmetro tipo deve ser 'xp' ou 'desafios'"}), 400
+
+    try:
+        vizinhos = int(request.args.get('vizinhos', 0))
+    except ValueError:
+        return jsonify({'message': 'Parâmetro vizinhos deve ser um número inteiro'}), 400
+    vizinhos = max(0, min(vizinhos, current_app.config['RANKING_VIZINHOS_MAX']))
+
+    usuario = db.session.get(Usuario, int(get_jwt_identity()))
+    if not usuario:
+        return jsonify({'message': 'Usuário não encontrado'}), 404
+
+    # Os pontos do próprio usuário vêm do banco, para que a posição dele esteja sempre atualizada
+    if tipo == 'xp':
+        pontos = usuario.xp_total
+    else:
+        pontos = usuario.obter_estatisticas().desafios_concluidos
+    posicao = rankings.posicao(tipo, usuario.id, pontos)
+
+    return jsonify({
+        'message': 'Posição obtida com sucesso',
+        'tipo': tipo,
+        'posicao': posicao['posicao'],
+        'pontos': posicao['pontos'],
+        'total': rankings.total(tipo),
+        'vizinhos': completar_entradas(rankings.vizinhos(tipo, usuario.id, vizinhos)) if vizinhos else []
+    }), 200
+
+def completar_entradas(entradas):
+    """
+    Função auxiliar para adicionar nome e nível às entradas do ranking com uma única consulta
+    """
+    if not entradas:
+        return []
+
+    usuarios = {
+        usuario_id: (nome, nivel)
+        for usuario_id, nome, nivel in db.session.query(Usuario.id, Usuario.nome, Usuario.nivel).filter(
+            Usuario.id.in_([entrada['usuario_id'] for entrada in entradas])
+        )
+    }
+    resultado = []
+    for entrada in entradas:
+        if entrada['usuario_id'] not in usuarios:
+            # Usuário removido depois da última montagem do ranking
+            continue
+        nome, nivel = usuarios[entrada['usuario_id']]
+        resultado.append({**entrada, 'nome': nome, 'nivel': nivel})
+    return resultado
@@ -0,0 +1,295 @@
+from datetime import datetime
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import insert, update
+from app.models import (
+    Usuario, Avaliacao, MediaCategoriaAvaliacao, Resultado, ProgressoPeriodo, SubmissaoDesafio, insert_sem_conflito
+)
+from app.catalogo import catalogo_perguntas
+from app.pontuacao import gabaritos
+from app.resources.assessment import validar_respostas, calcular_pontuacao, gerar_feedback
+from app import db
+
+sync_bp = Blueprint('sincronizacao', __name__)
+
+@sync_bp.route('', methods=['POST'])
+@jwt_required()
+def sincronizar():
+    """
+    Endpoint para sincronizar em lote avaliações e respostas de quizzes feitas offline
+    ---
+    Requer:
+      - Token de acesso JWT válido
+    Parâmetros:
+      - itens: Lista de submissões, cada uma com:
+          - id_cliente: Identificador único gerado pelo cliente
+          - tipo: 'avaliacao' ou 'desafio'
+          - respostas (avaliacao): Objeto com as respostas do teste (id_pergunta: valor_resposta)
+          - data (avaliacao, opcional): Data ISO 8601 em que o teste foi respondido
+          - desafio_id e respostasQuiz (desafio): Respostas do quiz (id_pergunta: índice da opção)
+    Retorna:
+      - Resultado de cada item, na ordem recebida. Itens já sincronizados retornam 'duplicado';
+        quizzes do mesmo desafio seguidos por outro no mesmo lote retornam 'substituido'.
+    """
+    usuario_id = int(get_jwt_identity())
+    data = request.get_json()
+
+    if not data or not isinstance(data.get('itens'), list):
+        return jsonify({'message': 'Dados incompletos. A lista de itens é obrigatória.'}), 400
+
+    itens = data['itens']
+    if len(itens) > current_app.config['SYNC_MAX_ITENS']:
+        return jsonify({
+            'message': f"Máximo de {current_app.config['SYNC_MAX_ITENS']} itens por sincronização"
+        }), 413
+
+    resultados = [None] * len(itens)
+    avaliacoes = []
+    desafios = []
+    for posicao, item in enumerate(itens):
+        id_cliente = item.get('id_cliente') if isinstance(item, dict) else None
+        if not isinstance(id_cliente, str) or not id_cliente or len(id_cliente) > 64:
+            resultados[posicao] = item_erro(id_cliente, 'id_cliente é obrigatório (texto de até 64 caracteres)')
+        elif item.get('tipo') == 'avaliacao':
+            avaliacoes.append((posicao, item))
+        elif item.get('tipo') == 'desafio':
+            desafios.append((posicao, item))
+        else:
+            resultados[posicao] = item_erro(id_cliente, "tipo deve ser 'avaliacao' ou 'desafio'")
+
+    sincronizar_avaliacoes(usuario_id, avaliacoes, resultados)
+    sincronizar_desafios(usuario_id, desafios, resultados)
+
+    db.session.commit()
+
+    return jsonify({
+        'message': 'Sincronização concluída',
+        'resultados': resultados
+    }), 200
+
+def item_erro(id_cliente, mensagem):
+    return {'id_cliente': id_cliente, 'status': 'erro', 'message': mensagem}
+
+def sincronizar_avaliacoes(usuario_id, itens, resultados):
+    """
+    Valida as avaliações contra o catálogo em cache e as grava com inserts em lote
+    """
+    if not itens:
+        return
+
+    catalogo = catalogo_perguntas.obter()
+    ja_sincronizadas = {
+        id_cliente: avaliacao_id
+        for avaliacao_id, id_cliente in db.session.query(Avaliacao.id, Avaliacao.id_cliente).filter(
+            Avaliacao.usuario_id == usuario_id,
+            Avaliacao.id_cliente.in_([item['id_cliente'] for _, item in itens])
+        )
+    }
+
+    linhas = []
+    medias = {}
+    posicoes = {}
+    for posicao, item in itens:
+        id_cliente = item['id_cliente']
+        if id_cliente in ja_sincronizadas:
+            resultados[posicao] = {'id_cliente': id_cliente, 'status': 'duplicado',
+                                   'avaliacao_id': ja_sincronizadas[id_cliente]}
+            continue
+        if id_cliente in posicoes:
+            resultados[posicao] = item_erro(id_cliente, 'id_cliente repetido nesta sincronização')
+            continue
+
+        respostas = item.get('respostas')
+        erro = validar_respostas(respostas, catalogo)
+        try:
+            pontuacao = calcular_pontuacao(respostas) if not erro else None
+            data_resposta = datetime.fromisoformat(item['data']) if item.get('data') else datetime.utcnow()
+        except (TypeError, ValueError):
+            erro = erro or 'Respostas ou data em formato inválido'
+        if erro:
+            resultados[posicao] = item_erro(id_cliente, erro)
+            continue
+
+        posicoes[id_cliente] = posicao
+        medias[id_cliente] = Avaliacao.medias_por_categoria(respostas, catalogo.categorias_por_pergunta)
+        linhas.append({
+            'usuario_id': usuario_id,
+            'data': data_resposta,
+            'pontuacao': int(pontuacao * 20),  # Converter para escala de 0-100
+            'feedback': gerar_feedback(pontuacao),
+            'respostas': respostas,
+            'id_cliente': id_cliente
+        })
+
+    if not linhas:
+        return
+
+    # Uma sincronização concorrente pode ter gravado os mesmos itens depois da leitura acima:
+    # essas linhas não são inseridas (nem retornadas) e os itens saem como 'duplicado'
+    inseridas = db.session.execute(
+        insert_sem_conflito(Avaliacao, Avaliacao.usuario_id, Avaliacao.id_cliente)
+        .returning(Avaliacao.id, Avaliacao.id_cliente, Avaliacao.pontuacao),
+        linhas
+    ).all()
+    concorrentes = set(posicoes) - {id_cliente for _, id_cliente, _ in inseridas}
+    if concorrentes:
+        for avaliacao_id, id_cliente in db.session.query(Avaliacao.id, Avaliacao.id_cliente).filter(
+            Avaliacao.usuario_id == usuario_id, Avaliacao.id_cliente.in_(concorrentes)
+        ):
+            resultados[posicoes[id_cliente]] = {'id_cliente': id_cliente, 'status': 'duplicado',
+                                                'avaliacao_id': avaliacao_id}
+
+    linhas_medias = []
+    for avaliacao_id, id_cliente, pontuacao in inseridas:
+        resultados[posicoes[id_cliente]] = {'id_cliente': id_cliente, 'status': 'criado',
+                                            'avaliacao_id': avaliacao_id, 'pontuacao': pontuacao}
+        linhas_medias.extend(
+            {'avaliacao_id': avaliacao_id, 'categoria': categoria, 'media': media}
+            for categoria, media in medias[id_cliente].items()
+        )
+    if linhas_medias:
+        db.session.execute(insert(MediaCategoriaAvaliacao), linhas_medias)
+
+def sincronizar_desafios(usuario_id, itens, resultados):
+    """
+    Corrige as respostas dos quizzes com os gabaritos em cache e grava os resultados em lote
+    """
+    if not itens:
+        return
+
+    existentes = {
+        resultado.desafio_id: resultado
+        for resultado in db.session.query(
+            Resultado.id, Resultado.desafio_id, Resultado.status, Resultado.pontuacao, Resultado.id_cliente,
+            Resultado.data_conclusao
+        ).filter(
+            Resultado.usuario_id == usuario_id,
+            Resultado.desafio_id.in_({
+                item.get('desafio_id') for _, item in itens if type(item.get('desafio_id')) is int
+            })
+        )
+    }
+    ja_sincronizadas = {
+        submissao.id_cliente: submissao
+        for submissao in db.session.query(
+            SubmissaoDesafio.id_cliente, SubmissaoDesafio.desafio_id, SubmissaoDesafio.pontuacao
+        ).filter(
+            SubmissaoDesafio.usuario_id == usuario_id,
+            SubmissaoDesafio.id_cliente.in_([item['id_cliente'] for _, item in itens])
+        )
+    }
+
+    # Corrige os itens válidos; cada id_cliente é registrado como submissão antes de ser aplicado
+    validos = []
+    submissoes = {}
+    for posicao, item in itens:
+        id_cliente = item['id_cliente']
+        desafio_id = item.get('desafio_id')
+        respostas_quiz = item.get('respostasQuiz')
+
+        existente = existentes.get(desafio_id)
+        sincronizada = ja_sincronizadas.get(id_cliente)
+        if sincronizada is not None:
+            resultados[posicao] = {'id_cliente': id_cliente, 'status': 'duplicado',
+                                   'desafio_id': sincronizada.desafio_id, 'pontuacao': sincronizada.pontuacao}
+            continue
+        if existente is not None and existente.id_cliente == id_cliente:
+            # Sincronizada antes do registro das submissões: só a última ficou no resultado
+            resultados[posicao] = {'id_cliente': id_cliente, 'status': 'duplicado',
+                                   'desafio_id': desafio_id, 'pontuacao': existente.pontuacao}
+            continue
+        if id_cliente in submissoes:
+            resultados[posicao] = item_erro(id_cliente, 'id_cliente repetido nesta sincronização')
+            continue
+
+        gabarito = gabaritos.obter(desafio_id) if type(desafio_id) is int else None
+        if not gabarito:
+            resultados[posicao] = item_erro(id_cliente, 'Desafio não encontrado')
+            continue
+        if not isinstance(respostas_quiz, dict):
+            resultados[posicao] = item_erro(id_cliente, 'respostasQuiz deve ser um objeto {id da pergunta: índice da opção}')
+            continue
+
+        pontuacao = gabarito.corrigir(respostas_quiz)
+        validos.append((posicao, id_cliente, desafio_id, respostas_quiz, pontuacao, gabarito.total))
+        submissoes[id_cliente] = {'usuario_id': usuario_id, 'id_cliente': id_cliente, 'desafio_id': desafio_id,
+                                  'pontuacao': pontuacao, 'data': datetime.utcnow()}
+
+    if not validos:
+        return
+
+    # Carregar as estatísticas antes de gravar, para não contar as novas pontuações duas vezes
+    estatisticas = db.session.get(Usuario, usuario_id).obter_estatisticas()
+
+    # Submissões gravadas por uma sincronização concorrente depois da leitura acima não são
+    # inseridas: esses itens saem como 'duplicado' e não são aplicados de novo
+    aceitas = set(db.session.execute(
+        insert_sem_conflito(SubmissaoDesafio, SubmissaoDesafio.usuario_id, SubmissaoDesafio.id_cliente)
+        .returning(SubmissaoDesafio.id_cliente),
+        list(submissoes.values())
+    ).scalars())
+
+    # Uma submissão por desafio: se o mesmo desafio aparecer mais de uma vez, vale a última
+    # e as anteriores são retornadas como 'substituido'
+    novos = {}
+    atualizados = {}
+    ultima_posicao = {}
+    ajuste_pontos = 0
+    ajustes_por_dia = {}
+
+    def aplicar_em_existente(existente, desafio_id, dados):
+        nonlocal ajuste_pontos
+        if existente.status == 'concluído':
+            diferenca = dados['pontuacao'] - atualizados.get(desafio_id, {}).get('pontuacao', existente.pontuacao or 0)
+            ajuste_pontos += diferenca
+            if existente.data_conclusao:
+                dia = existente.data_conclusao.date()
+                ajustes_por_dia[dia] = ajustes_por_dia.get(dia, 0) + diferenca
+        atualizados[desafio_id] = {'id': existente.id, **dados}
+
+    for posicao, id_cliente, desafio_id, respostas_quiz, pontuacao, total in validos:
+        if id_cliente not in aceitas:
+            resultados[posicao] = {'id_cliente': id_cliente, 'status': 'duplicado',
+                                   'desafio_id': desafio_id, 'pontuacao': pontuacao}
+            continue
+
+        existente = existentes.get(desafio_id)
+        dados = {'respostas_quiz': respostas_quiz, 'pontuacao': pontuacao, 'id_cliente': id_cliente}
+        if existente is None:
+            novos[desafio_id] = {'usuario_id': usuario_id, 'desafio_id': desafio_id, 'status': 'em_andamento',
+                                 'data_inicio': datetime.utcnow(), **dados}
+        else:
+            aplicar_em_existente(existente, desafio_id, dados)
+
+        if desafio_id in ultima_posicao:
+            substituida = resultados[ultima_posicao[desafio_id]]
+            resultados[ultima_posicao[desafio_id]] = {**substituida, 'status': 'substituido', 'substituido_por': id_cliente}
+        ultima_posicao[desafio_id] = posicao
+        resultados[posicao] = {'id_cliente': id_cliente, 'status': 'atualizado' if existente else 'criado',
+                               'desafio_id': desafio_id, 'pontuacao': pontuacao, 'total': total,
+                               'concluido': bool(existente) and existente.status == 'concluído'}
+
+    if novos:
+        criados = set(db.session.execute(
+            insert_sem_conflito(Resultado, Resultado.usuario_id, Resultado.desafio_id).returning(Resultado.desafio_id),
+            list(novos.values())
+        ).scalars())
+        concorrentes = set(novos) - criados
+        if concorrentes:
+            # Resultados criados por outra requisição depois da leitura: a submissão é aplicada sobre eles
+            for existente in db.session.query(
+                Resultado.id, Resultado.desafio_id, Resultado.status, Resultado.pontuacao, Resultado.data_conclusao
+            ).filter(Resultado.usuario_id == usuario_id, Resultado.desafio_id.in_(concorrentes)):
+                novo = novos[existente.desafio_id]
+                aplicar_em_existente(existente, existente.desafio_id,
+                                     {campo: novo[campo] for campo in ('respostas_quiz', 'pontuacao', 'id_cliente')})
+                resultado = resultados[ultima_posicao[existente.desafio_id]]
+                resultado.update(status='atualizado', concluido=existente.status == 'concluído')
+
+    if ajuste_pontos:
+        estatisticas.ajustar_pontuacao(ajuste_pontos)
+    for dia, diferenca in ajustes_por_dia.items():
+        if diferenca:
+            ProgressoPeriodo.ajustar_pontos(usuario_id, dia, diferenca)
+    if atualizados:
+        db.session.execute(update(Resultado), list(atualizados.values()))
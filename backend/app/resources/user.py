@@ -1,11 +1,27 @@
-from flask import Blueprint, request, jsonify
+import base64
+import binascii
+from datetime import date, datetime, timedelta
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import Usuario, Avaliacao, Resultado
+from sqlalchemy.orm import joinedload, lazyload, load_only
+from app.models import Usuario, Avaliacao, Resultado, Desafio, ProgressoPeriodo
+from app.identidade import identidade_atual, modo_claims
+from app.http_cache import etag_forte, resposta_condicional
 from app import db
-from werkzeug.security import generate_password_hash
 
 user_bp = Blueprint('user', __name__)
 
+# Coleções que podem ser incluídas no perfil e os campos aceitos em cada grupo de `fields`
+COLECOES_PERFIL = {'avaliacoes': Avaliacao, 'resultados': Resultado}
+CAMPOS_PERFIL = {
+    'perfil': (*Usuario.CAMPOS, *Usuario.CAMPOS_CALCULADOS),
+    'avaliacoes': tuple(Avaliacao.CAMPOS),
+    'resultados': Resultado.CAMPOS,
+}
+
+# Quantidade de períodos da série de progresso quando o início não é informado
+SERIE_PERIODOS_PADRAO = {'dia': 30, 'semana': 12}
+
 @user_bp.route('/profile', methods=['GET'])
 @jwt_required()
 def obter_perfil():
@@ -14,29 +30,118 @@ def obter_perfil():
     ---
     Requer:
       - Token de acesso JWT válido
+    Parâmetros de consulta:
+      - fields: Lista de campos separados por vírgula. Campos do perfil sem prefixo
+        (ex.: nome,nivel) e das coleções com prefixo (ex.: resultados.status,avaliacoes.data).
+        Sem campos de um grupo, todos os campos dele são retornados.
+      - include: Coleções a incluir, separadas por vírgula: avaliacoes, resultados
+        (padrão: ambas; vazio para apenas os dados do perfil)
+      - limite: Itens por página de cada coleção (padrão COLECOES_PERFIL_POR_PAGINA)
+      - cursor_avaliacoes, cursor_resultados: Valor de `proximos_cursores` da página anterior
     Retorna:
-      - Informações do perfil do usuário
+      - Informações do perfil do usuário, uma página de cada coleção incluída (da mais
+        recente para a mais antiga) e o cursor da próxima página de cada uma
     """
-    current_user_id = get_jwt_identity()
-    usuario = Usuario.query.get(int(current_user_id))
+    current_user_id = int(get_jwt_identity())
+    
+    # Coleções incluídas
+    if request.args.get('include') is None:
+        incluir = list(COLECOES_PERFIL)
+    else:
+        incluir = [nome.strip() for nome in request.args['include'].split(',') if nome.strip()]
+        invalidas = [nome for nome in incluir if nome not in COLECOES_PERFIL]
+        if invalidas:
+            return jsonify({'message': f'Coleções inválidas: {", ".join(invalidas)}'}), 400
+    
+    # Campos solicitados por grupo (perfil e cada coleção)
+    campos = {'perfil': None, **{nome: None for nome in COLECOES_PERFIL}}
+    invalidos = []
+    for campo in (request.args.get('fields') or '').split(','):
+        campo = campo.strip()
+        if not campo:
+            continue
+        grupo, _, nome = campo.rpartition('.')
+        grupo = grupo or 'perfil'
+        if grupo not in campos or nome not in CAMPOS_PERFIL[grupo]:
+            invalidos.append(campo)
+        else:
+            campos[grupo] = (campos[grupo] or []) + [nome]
+    if invalidos:
+        return jsonify({'message': f'Campos inválidos: {", ".join(invalidos)}'}), 400
+    
+    # Tamanho da página das coleções
+    try:
+        limite = int(request.args.get('limite', current_app.config['COLECOES_PERFIL_POR_PAGINA']))
+    except ValueError:
+        return jsonify({'message': 'Parâmetro limite inválido'}), 400
+    limite = max(1, min(limite, current_app.config['COLECOES_PERFIL_POR_PAGINA_MAX']))
+    
+    # Carregar apenas as colunas do usuário necessárias para os campos solicitados
+    campos_usuario = campos['perfil'] or list(CAMPOS_PERFIL['perfil'])
+    opcoes = [load_only(*Usuario.colunas(campos_usuario))]
+    if 'desafios_concluidos' not in campos_usuario:
+        opcoes.append(lazyload(Usuario.estatisticas))
+    usuario = db.session.get(Usuario, current_user_id, options=opcoes)
     
     if not usuario:
         return jsonify({'message': 'Usuário não encontrado'}), 404
     
-    # Obter avaliações e resultados do usuário
-    avaliacoes = Avaliacao.query.filter_by(usuario_id=int(current_user_id)).all()
-    resultados = Resultado.query.filter_by(usuario_id=int(current_user_id)).all()
-    
-    # Preparar dados para retorno
-    perfil = usuario.to_dict()
-    perfil['avaliacoes'] = [avaliacao.to_dict() for avaliacao in avaliacoes]
-    perfil['resultados'] = [resultado.to_dict() for resultado in resultados]
+    perfil = usuario.to_dict(campos_usuario)
+    proximos_cursores = {}
+    for nome in incluir:
+        try:
+            itens, proximos_cursores[nome] = pagina_colecao_perfil(
+                nome, current_user_id, campos[nome], limite, request.args.get(f'cursor_{nome}')
+            )
+        except ValueError:
+            return jsonify({'message': f'Cursor inválido: cursor_{nome}'}), 400
+        perfil[nome] = itens
     
     return jsonify({
         'message': 'Perfil obtido com sucesso',
-        'perfil': perfil
+        'perfil': perfil,
+        'proximos_cursores': proximos_cursores
     }), 200
 
+def pagina_colecao_perfil(nome, usuario_id, campos, limite, cursor):
+    """
+    Função auxiliar que retorna uma página de uma coleção do perfil, selecionando apenas as
+    colunas dos campos solicitados, e o cursor da próxima página. Levanta ValueError se o cursor for inválido.
+    """
+    modelo = COLECOES_PERFIL[nome]
+    campos = campos or list(CAMPOS_PERFIL[nome])
+    
+    query = modelo.query.options(load_only(*modelo.colunas(set(campos) | {'id'}))).filter(
+        modelo.usuario_id == usuario_id
+    )
+    if modelo is Avaliacao and 'medias_por_categoria' not in campos:
+        # As médias são carregadas por selectin; sem o campo, não há por que consultá-las
+        query = query.options(lazyload(Avaliacao.medias))
+    if cursor:
+        query = query.filter(modelo.id < decodificar_cursor_id(cursor))
+    
+    itens = query.order_by(modelo.id.desc()).limit(limite + 1).all()
+    proximo_cursor = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        proximo_cursor = codificar_cursor_id(itens[-1].id)
+    return [item.to_dict(campos=campos) for item in itens], proximo_cursor
+
+def codificar_cursor_id(item_id):
+    """
+    Função auxiliar para gerar o cursor opaco que aponta para depois do item informado
+    """
+    return base64.urlsafe_b64encode(str(item_id).encode()).decode()
+
+def decodificar_cursor_id(cursor):
+    """
+    Função auxiliar para ler um cursor gerado por codificar_cursor_id. Levanta ValueError se inválido.
+    """
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(str(e))
+
 @user_bp.route('/perfil', methods=['PUT'])
 @jwt_required()
 def atualizar_perfil():
@@ -87,7 +192,7 @@ def atualizar_perfil():
             return jsonify({'message': 'Senha atual incorreta'}), 401
         
         # Atualizar a senha
-        usuario.senha_hash = generate_password_hash(data['nova_senha'])
+        usuario.definir_senha(data['nova_senha'])
     
     # Salvar alterações
     db.session.commit()
@@ -116,7 +221,7 @@ def obter_progresso():
         'nivel': usuario.nivel,
         'xp': usuario.xp,
         'proximo_nivel_xp': usuario.calcular_proximo_nivel_xp(),
-        'desafios_concluidos': usuario.calcular_desafios_concluidos(),
+        'desafios_concluidos': usuario.obter_estatisticas().desafios_concluidos,
         'sequencia': usuario.calcular_sequencia(),
         'resultados': [{
             'data_conclusao': r.data_conclusao.strftime('%d/%m/%Y'),
@@ -129,6 +234,74 @@ def obter_progresso():
         'progresso': progresso
     }), 200
 
+@user_bp.route('/progresso/serie', methods=['GET'])
+@jwt_required()
+def obter_serie_progresso():
+    """
+    Endpoint para obter a série temporal de progresso do usuário autenticado
+    ---
+    Requer:
+      - Token de acesso JWT válido
+    Parâmetros de consulta:
+      - granularidade: 'dia' (padrão) ou 'semana' (semanas iniciadas na segunda-feira)
+      - inicio: Data inicial no formato AAAA-MM-DD (padrão: 30 dias ou 12 semanas antes do fim)
+      - fim: Data final no formato AAAA-MM-DD (padrão: hoje)
+    Retorna:
+      - Um ponto por período do intervalo, com conclusões, pontos e XP (zero nos períodos sem atividade)
+    """
+    current_user_id = int(get_jwt_identity())
+    
+    granularidade = request.args.get('granularidade', 'dia')
+    if granularidade not in ProgressoPeriodo.GRANULARIDADES:
+        return jsonify({'message': "Parâmetro granularidade deve ser 'dia' ou 'semana'"}), 400
+    passo = timedelta(weeks=1) if granularidade == 'semana' else timedelta(days=1)
+    
+    try:
+        fim = date.fromisoformat(request.args['fim']) if request.args.get('fim') else datetime.utcnow().date()
+        inicio = date.fromisoformat(request.args['inicio']) if request.args.get('inicio') else \
+            fim - passo * (SERIE_PERIODOS_PADRAO[granularidade] - 1)
+    except ValueError:
+        return jsonify({'message': 'Parâmetros inicio e fim devem estar no formato AAAA-MM-DD'}), 400
+    
+    inicio = ProgressoPeriodo.inicio_periodo(inicio, granularidade)
+    fim = ProgressoPeriodo.inicio_periodo(fim, granularidade)
+    if inicio > fim:
+        return jsonify({'message': 'Parâmetro inicio deve ser anterior ao fim'}), 400
+    quantidade = (fim - inicio) // passo + 1
+    if quantidade > current_app.config['SERIE_PROGRESSO_MAX_PERIODOS']:
+        return jsonify({'message': f"Intervalo maior que {current_app.config['SERIE_PROGRESSO_MAX_PERIODOS']} períodos"}), 400
+    
+    # Uma leitura por intervalo da chave primária (usuario_id, granularidade, inicio)
+    periodos = {
+        periodo.inicio: periodo
+        for periodo in db.session.query(
+            ProgressoPeriodo.inicio, ProgressoPeriodo.conclusoes, ProgressoPeriodo.pontos, ProgressoPeriodo.xp
+        ).filter(
+            ProgressoPeriodo.usuario_id == current_user_id,
+            ProgressoPeriodo.granularidade == granularidade,
+            ProgressoPeriodo.inicio.between(inicio, fim)
+        )
+    }
+    
+    serie = []
+    for indice in range(quantidade):
+        dia = inicio + passo * indice
+        periodo = periodos.get(dia)
+        serie.append({
+            'inicio': dia,
+            'conclusoes': periodo.conclusoes if periodo else 0,
+            'pontos': periodo.pontos if periodo else 0,
+            'xp': periodo.xp if periodo else 0
+        })
+    
+    return jsonify({
+        'message': 'Série de progresso obtida com sucesso',
+        'granularidade': granularidade,
+        'inicio': inicio,
+        'fim': fim,
+        'serie': serie
+    }), 200
+
 @user_bp.route('/challenge-history', methods=['GET'])
 @jwt_required()
 def obter_historico_desafios():
@@ -142,14 +315,16 @@ def obter_historico_desafios():
     """
     current_user_id = get_jwt_identity()
     
-    # Obter resultados dos desafios concluídos
-    resultados = Resultado.query.filter_by(usuario_id=int(current_user_id), status='concluído').all()
+    # Obter resultados dos desafios concluídos, trazendo o título do desafio na mesma consulta
+    resultados = Resultado.query.options(
+        joinedload(Resultado.desafio).load_only(Desafio.titulo)
+    ).filter_by(usuario_id=int(current_user_id), status='concluído').all()
     
     historico = [
         {
             'id': resultado.desafio_id,
             'titulo': resultado.desafio.titulo,
-            'data_conclusao': resultado.data_conclusao.isoformat(),
+            'data_conclusao': resultado.data_conclusao,
             'pontuacao': resultado.pontuacao
         }
         for resultado in resultados
@@ -177,10 +352,11 @@ def get_current_user():
     if not usuario:
         return jsonify({'message': 'Usuário não encontrado'}), 404
 
-    return jsonify({
+    etag = etag_forte('me', usuario.id, usuario.versao_perfil, usuario.obter_estatisticas().desafios_concluidos)
+    return resposta_condicional(etag, lambda: (jsonify({
         'message': 'Usuário obtido com sucesso',
         'usuario': usuario.to_dict()
-    }), 200
+    }), 200))
 
 @user_bp.route('/initial-test-status', methods=['GET'])
 @jwt_required()
@@ -188,6 +364,13 @@ def verificar_teste_inicial():
     """
     Endpoint para verificar se o teste inicial foi concluído
     """
+    # Modo leve: responder a partir das claims do token
+    if modo_claims() != 'desligado':
+        identidade = identidade_atual()
+        if not identidade:
+            return jsonify({'message': 'Usuário não encontrado'}), 404
+        return jsonify({'done': identidade['teste_inicial_concluido']}), 200
+
     current_user_id = get_jwt_identity()
     usuario = Usuario.query.get(current_user_id)
 
@@ -0,0 +1,161 @@
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as TempoEsgotado
+from contextlib import contextmanager
+from functools import lru_cache
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+from app import metricas
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+class SenhasSobrecarregadas(Exception):
+    """Levantada quando não há vaga para hashing dentro do prazo e a requisição deve ser recusada"""
+
+class LimiteGlobal:
+    """
+    Limita os hashes simultâneos somando todos os processos da máquina (workers do gunicorn).
+
+    Cada vaga é um arquivo em `diretorio`, ocupado com flock enquanto o hash é calculado. O kernel
+    libera a trava quando o processo termina, então um worker que morre não deixa vaga presa.
+    Sem fcntl (Windows), o limite vale apenas para o processo atual.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._semaforos = {}
+
+    @contextmanager
+    def vaga(self, diretorio, vagas, espera):
+        """Ocupa uma vaga, esperando até `espera` segundos; levanta SenhasSobrecarregadas se não houver"""
+        if fcntl is None:
+            with self._vaga_local(vagas, espera):
+                yield
+            return
+
+        os.makedirs(diretorio, exist_ok=True)
+        prazo = time.monotonic() + espera
+        while True:
+            descritor = self._ocupar(diretorio, vagas)
+            if descritor is not None:
+                break
+            if time.monotonic() >= prazo:
+                raise SenhasSobrecarregadas()
+            time.sleep(0.01)
+
+        try:
+            yield
+        finally:
+            fcntl.flock(descritor, fcntl.LOCK_UN)
+            os.close(descritor)
+
+    @staticmethod
+    def _ocupar(diretorio, vagas):
+        for indice in range(vagas):
+            descritor = os.open(os.path.join(diretorio, f'vaga-{indice}'), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(descritor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return descritor
+            except BlockingIOError:
+                os.close(descritor)
+        return None
+
+    @contextmanager
+    def _vaga_local(self, vagas, espera):
+        with self._lock:
+            semaforo = self._semaforos.setdefault(vagas, threading.BoundedSemaphore(vagas))
+        if not semaforo.acquire(timeout=espera):
+            raise SenhasSobrecarregadas()
+        try:
+            yield
+        finally:
+            semaforo.release()
+
+limite_global = LimiteGlobal()
+
+class PoolSenhas:
+    """
+    Executa hashing e verificação de senhas limitados por SENHA_LIMITE_GLOBAL vagas na máquina.
+
+    Por padrão o hash é calculado na própria thread da requisição: o hashlib libera o GIL, e com
+    os workers gthread do gunicorn (gunicorn.conf.py) as outras threads do worker continuam
+    atendendo. Com SENHA_POOL_PROCESSOS > 0 o cálculo vai para um pool de processos criado sob
+    demanda em cada worker (depois do fork), com SENHA_POOL_TIMEOUT segundos de prazo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _obter_executor(self, processos):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=processos)
+                self._pid = os.getpid()
+            return self._executor
+
+    def executar(self, funcao, *args):
+        config = current_app.config
+        vagas = config['SENHA_LIMITE_GLOBAL']
+        if not vagas:
+            return self._calcular(funcao, args, config)
+
+        diretorio = config['SENHA_LIMITE_DIRETORIO'] or os.path.join(tempfile.gettempdir(), 'humaniq-senhas')
+        with limite_global.vaga(diretorio, vagas, config['SENHA_ESPERA_MAX']):
+            return self._calcular(funcao, args, config)
+
+    def _calcular(self, funcao, args, config):
+        processos = config['SENHA_POOL_PROCESSOS']
+        if not processos:
+            return funcao(*args)
+
+        futuro = self._obter_executor(processos).submit(funcao, *args)
+        try:
+            return futuro.result(timeout=config['SENHA_POOL_TIMEOUT'])
+        except TempoEsgotado:
+            futuro.cancel()
+            raise SenhasSobrecarregadas()
+
+    def encerrar(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+pool_senhas = PoolSenhas()
+
+def _configuracao():
+    if not has_app_context():
+        return 'pbkdf2', 16
+    return current_app.config['SENHA_METODO'], current_app.config['SENHA_SALT_LENGTH']
+
+@lru_cache(maxsize=8)
+def _prefixo_metodo(metodo, salt_length):
+    """Prefixo completo (ex.: 'pbkdf2:sha256:600000') gerado pelo método configurado"""
+    return generate_password_hash('', method=metodo, salt_length=salt_length).split('$', 1)[0]
+
+def gerar_hash(senha):
+    """Gera o hash da senha com o método configurado"""
+    metodo, salt_length = _configuracao()
+    if not has_app_context():
+        return generate_password_hash(senha, method=metodo, salt_length=salt_length)
+    with metricas.duracao_hash_senha.labels(operacao='gerar').time():
+        return pool_senhas.executar(generate_password_hash, senha, metodo, salt_length)
+
+def verificar(senha_hash, senha):
+    """Verifica a senha contra o hash armazenado"""
+    if not has_app_context():
+        return check_password_hash(senha_hash, senha)
+    with metricas.duracao_hash_senha.labels(operacao='verificar').time():
+        return pool_senhas.executar(check_password_hash, senha_hash, senha)
+
+def precisa_rehash(senha_hash):
+    """Indica se o hash foi gerado com um método ou custo diferente do configurado"""
+    metodo, salt_length = _configuracao()
+    return senha_hash.split('$', 1)[0] != _prefixo_metodo(metodo, salt_length)
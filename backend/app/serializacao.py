@@ -0,0 +1,98 @@
+import json
+import secrets
+from datetime import date, datetime, time
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - o orjson é opcional
+    orjson = None
+
+# orjson >= 3.9 incorpora fragmentos nativamente; nas versões anteriores eles são substituídos depois
+_FragmentoNativo = getattr(orjson, 'Fragment', None)
+
+# Marcador dos fragmentos substituídos depois da codificação, único por processo
+_MARCADOR = f"@@fragmento-{secrets.token_hex(8)}-"
+
+class FragmentoJSON:
+    """
+    JSON já codificado (ex.: payload em cache) que é incorporado à resposta sem ser decodificado e
+    codificado de novo. O conteúdo não é validado: deve ser um JSON válido.
+    """
+
+    __slots__ = ('dados',)
+
+    def __init__(self, dados):
+        self.dados = dados.encode() if isinstance(dados, str) else dados
+
+def _padrao(objeto):
+    # Datas no formato ISO 8601, como o orjson (o padrão do Flask usaria o formato HTTP)
+    if isinstance(objeto, (datetime, date, time)):
+        return objeto.isoformat()
+    return DefaultJSONProvider.default(objeto)
+
+def _substituir_fragmentos(dados, fragmentos):
+    for indice, fragmento in enumerate(fragmentos):
+        dados = dados.replace(f'"{_MARCADOR}{indice}"'.encode(), fragmento, 1)
+    return dados
+
+class ProvedorJSON(DefaultJSONProvider):
+    """
+    Provedor JSON do Flask que codifica com o orjson quando ele está instalado (e JSON_RAPIDO está
+    ligado), e com o json da biblioteca padrão caso contrário. Em ambos os casos datetime, date e
+    time viram ISO 8601 sem chamadas a isoformat() nos modelos, e FragmentoJSON é incorporado sem
+    recodificação. As chaves continuam ordenadas, como no provedor padrão.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.usar_orjson = orjson is not None and app.config.get('JSON_RAPIDO', True)
+
+    def codificar(self, obj, indentar=False):
+        """Codifica `obj` em bytes UTF-8"""
+        fragmentos = []
+
+        def padrao(objeto):
+            if isinstance(objeto, FragmentoJSON):
+                if self.usar_orjson and _FragmentoNativo is not None:
+                    return _FragmentoNativo(objeto.dados)
+                fragmentos.append(objeto.dados)
+                return f"{_MARCADOR}{len(fragmentos) - 1}"
+            return _padrao(objeto)
+
+        if self.usar_orjson:
+            opcoes = orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                opcoes |= orjson.OPT_SORT_KEYS
+            if indentar:
+                opcoes |= orjson.OPT_INDENT_2
+            dados = orjson.dumps(obj, default=padrao, option=opcoes)
+        else:
+            dados = json.dumps(obj, default=padrao, ensure_ascii=self.ensure_ascii, sort_keys=self.sort_keys,
+                               indent=2 if indentar else None,
+                               separators=(',', ': ') if indentar else (',', ':')).encode()
+
+        return _substituir_fragmentos(dados, fragmentos) if fragmentos else dados
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Opções específicas do json (cls, indent...) ficam com o provedor padrão
+            kwargs.setdefault('default', self._padrao_com_fragmentos)
+            return super().dumps(obj, **kwargs)
+        return self.codificar(obj).decode()
+
+    @staticmethod
+    def _padrao_com_fragmentos(objeto):
+        if isinstance(objeto, FragmentoJSON):
+            return json.loads(objeto.dados)
+        return _padrao(objeto)
+
+    def loads(self, s, **kwargs):
+        if self.usar_orjson and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self.codificar(obj, indentar) + b'\n', mimetype=self.mimetype)
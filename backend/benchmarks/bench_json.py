@@ -0,0 +1,117 @@
+"""
+Microbenchmark da serialização JSON das respostas
+
+Serializa as saídas dos to_dict() dos modelos (perfil com avaliações e resultados, listagem e
+detalhe de desafios, catálogo de perguntas) com:
+  - flask: o provedor padrão do Flask, com as datas convertidas por isoformat() como antes;
+  - stdlib: ProvedorJSON com o json da biblioteca padrão (fallback sem orjson);
+  - orjson: ProvedorJSON com o orjson, quando instalado.
+Mostra também o ganho de incorporar o catálogo como FragmentoJSON em vez de recodificá-lo.
+
+Uso:
+    python benchmarks/bench_json.py [--resultados 200] [--repeticoes 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask.json.provider import DefaultJSONProvider
+from config import config, TestingConfig
+from app import create_app, db
+from app.catalogo import catalogo_perguntas
+from app.models import Usuario, Avaliacao, Resultado, Desafio, PerguntaTeste
+from app.serializacao import ProvedorJSON, orjson
+
+def criar_app(caminho_db):
+    class BenchmarkConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{caminho_db}'
+        INSTRUMENTACAO_ATIVA = False
+
+    config['benchmark'] = BenchmarkConfig
+    return create_app('benchmark')
+
+def gerar_payloads(resultados):
+    from seed import GeradorDados
+
+    GeradorDados(usuarios=2, desafios=max(resultados, 50), resultados_por_usuario=resultados,
+                 avaliacoes_por_usuario=20, pool_senhas=1).executar()
+
+    usuario = db.session.get(Usuario, 1)
+    perfil = usuario.to_dict()
+    perfil['avaliacoes'] = [avaliacao.to_dict() for avaliacao in Avaliacao.query.filter_by(usuario_id=1)]
+    perfil['resultados'] = [resultado.to_dict() for resultado in Resultado.query.filter_by(usuario_id=1)]
+
+    desafios = Desafio.query.order_by(Desafio.id).limit(50).all()
+    return {
+        'perfil': {'message': 'Perfil obtido com sucesso', 'perfil': perfil},
+        'desafios (lista)': {'desafios': [desafio.to_dict(Desafio.CAMPOS_LISTA) for desafio in desafios]},
+        'desafio (detalhe)': {'desafio': desafios[0].to_dict()},
+        'perguntas': {'perguntas': [pergunta.to_dict() for pergunta in PerguntaTeste.query.order_by(PerguntaTeste.ordem)]},
+    }
+
+def com_isoformat(valor):
+    """Converte as datas como os to_dict() faziam antes do ProvedorJSON"""
+    if isinstance(valor, dict):
+        return {chave: com_isoformat(item) for chave, item in valor.items()}
+    if isinstance(valor, list):
+        return [com_isoformat(item) for item in valor]
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+def provedores(app):
+    padrao = DefaultJSONProvider(app)
+    resultado = {'flask': lambda obj: padrao.response(com_isoformat(obj)).get_data()}
+    for nome, usar_orjson in (('stdlib', False), ('orjson', True)):
+        if usar_orjson and orjson is None:
+            continue
+        provedor = ProvedorJSON(app)
+        provedor.usar_orjson = usar_orjson
+        resultado[nome] = lambda obj, provedor=provedor: provedor.response(obj).get_data()
+    return resultado
+
+def medir(funcao, repeticoes):
+    """Melhor tempo por chamada, em microssegundos"""
+    return min(timeit.repeat(funcao, number=repeticoes, repeat=5)) / repeticoes * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resultados', type=int, default=200, help='resultados no perfil serializado')
+    parser.add_argument('--repeticoes', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        app = criar_app(os.path.join(diretorio, 'json.db'))
+        with app.test_request_context():
+            payloads = gerar_payloads(args.resultados)
+            codificadores = provedores(app)
+
+            print(f"{'payload':20s} {'bytes':>8s}" + ''.join(f" {nome + ' (µs)':>14s}" for nome in codificadores))
+            for nome, payload in payloads.items():
+                # O ajuste de datas faz parte do custo antigo (to_dict chamava isoformat)
+                tempos = [medir(lambda: codificar(payload), args.repeticoes) for codificar in codificadores.values()]
+                tamanho = len(codificadores['flask'](payload))
+                print(f"{nome:20s} {tamanho:8d}" + ''.join(f" {tempo:14.1f}" for tempo in tempos))
+
+            # Catálogo em cache: lista pronta recodificada a cada resposta vs. fragmento pré-codificado
+            perguntas = payloads['perguntas']['perguntas']
+            fragmento = catalogo_perguntas.obter().payload
+            print()
+            for nome, usar_orjson in (('stdlib', False), ('orjson', True)):
+                if usar_orjson and orjson is None:
+                    continue
+                app.json.usar_orjson = usar_orjson
+                recodificado = medir(lambda: app.json.response({'perguntas': perguntas}), args.repeticoes)
+                incorporado = medir(lambda: app.json.response({'perguntas': fragmento}), args.repeticoes)
+                print(f"catálogo ({nome}): recodificado {recodificado:.1f} µs, fragmento {incorporado:.1f} µs")
+
+            db.session.remove()
+            db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark de logins com hashing de senha no gunicorn, como na implantação
+
+Sobe run:app (FLASK_CONFIG=production) no gunicorn duas vezes sobre um banco temporário:
+  - antes: workers sync sem limite global (um hash de senha ocupa o worker inteiro);
+  - depois: a configuração do gunicorn.conf.py (workers gthread) com o limite global de hashes.
+Em cada uma, `--concorrencia` clientes fazem logins por HTTP enquanto outro cliente chama /api/ping,
+medindo logins por segundo, recusas (503) e a latência do ping durante a tempestade de logins.
+
+Uso:
+    python benchmarks/bench_senhas.py [--workers 2] [--concorrencia 16] [--duracao 10]
+                                      [--metodo pbkdf2:sha256:600000]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from carga import porta_livre, iniciar_servidor, requisitar, percentil
+
+EMAIL = 'bench@humaniq.local'
+SENHA = 'senha-benchmark'
+
+def medir(porta, concorrencia, duracao):
+    logins, recusas, erros, pings = [], [], [], []
+    fim = time.perf_counter() + duracao
+
+    def cliente():
+        while time.perf_counter() < fim:
+            try:
+                status, _, segundos = requisitar(porta, 'POST', '/api/auth/login', {'email': EMAIL, 'senha': SENHA})
+            except OSError:
+                status, segundos = 599, 0.0
+            (logins if status == 200 else recusas if status == 503 else erros).append(segundos)
+
+    def ping():
+        while time.perf_counter() < fim:
+            try:
+                pings.append(requisitar(porta, 'GET', '/api/ping')[2])
+            except OSError:
+                erros.append(0.0)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=cliente) for _ in range(concorrencia)] + [threading.Thread(target=ping)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    segundos = time.perf_counter() - inicio
+
+    pings.sort()
+    return {
+        'logins/s': len(logins) / segundos,
+        'recusas (503)': len(recusas),
+        'erros': len(erros),
+        'ping p50 (ms)': percentil(pings, 50) * 1000,
+        'ping p95 (ms)': percentil(pings, 95) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2, help='Workers do gunicorn (GUNICORN_WORKERS)')
+    parser.add_argument('--concorrencia', type=int, default=16, help='Clientes fazendo login ao mesmo tempo')
+    parser.add_argument('--duracao', type=float, default=10, help='Segundos de medição por cenário')
+    parser.add_argument('--metodo', default='pbkdf2:sha256:600000')
+    args = parser.parse_args()
+
+    cenarios = [
+        ('antes (workers sync)', ['--worker-class', 'sync', '--threads', '1'], {'SENHA_LIMITE_GLOBAL': '0'}),
+        ('depois (gunicorn.conf.py)', [], {}),
+    ]
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        env = dict(
+            os.environ,
+            FLASK_CONFIG='production',
+            DATABASE_URL=f"sqlite:///{os.path.join(diretorio, 'bench.db')}",
+            SENHA_METODO=args.metodo,
+            SENHA_LIMITE_DIRETORIO=os.path.join(diretorio, 'senhas'),
+            PROMETHEUS_MULTIPROC_DIR=os.path.join(diretorio, 'metricas'),
+        )
+        print(f"método={args.metodo} workers={args.workers} concorrência={args.concorrencia} "
+              f"núcleos={os.cpu_count()} limite global={env.get('SENHA_LIMITE_GLOBAL', os.cpu_count())}")
+
+        for nome, opcoes, variaveis in cenarios:
+            porta = porta_livre()
+            with open(os.path.join(diretorio, 'gunicorn.log'), 'a') as log:
+                servidor = iniciar_servidor(porta, args.workers, dict(env, **variaveis), log, aplicacao='run:app',
+                                            opcoes=opcoes, caminho_pronto='/api/ping')
+                try:
+                    requisitar(porta, 'POST', '/api/auth/register', {'nome': 'Benchmark', 'email': EMAIL, 'senha': SENHA})
+                    # Aquecimento: conexões, prefixo do método e vagas do limite global
+                    medir(porta, 1, 1)
+                    resultado = medir(porta, args.concorrencia, args.duracao)
+                finally:
+                    servidor.terminate()
+                    servidor.wait()
+            print(f"{nome:28s} " + '  '.join(f"{chave} {valor:.1f}" if isinstance(valor, float) else f"{chave} {valor}"
+                                             for chave, valor in resultado.items()))
+
+if __name__ == '__main__':
+    main()
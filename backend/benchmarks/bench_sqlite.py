@@ -0,0 +1,122 @@
+"""
+Benchmark de leituras e escritas concorrentes no SQLite, com o perfil padrão e com o perfil de produção
+(WAL, synchronous=NORMAL, busy_timeout, mmap, cache e pool de conexões de ProductionConfig)
+
+Processos leitores (como workers do gunicorn) consultam /desafios, /users/me e /users/progresso,
+enquanto processos escritores iniciam e concluem desafios. Mostra operações por segundo e erros
+(ex.: "database is locked") de cada perfil.
+
+Uso:
+    python benchmarks/bench_sqlite.py [--leitores 4] [--escritores 2] [--duracao 10] [--users 2000]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from config import config, TestingConfig, ProductionConfig
+
+PERFIS = {
+    'padrão': ({}, {}),
+    'produção': (ProductionConfig.SQLITE_PRAGMAS, ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS),
+}
+
+def criar_app(caminho_db, perfil):
+    from app import create_app
+
+    pragmas, opcoes = PERFIS[perfil]
+
+    class BenchmarkConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{caminho_db}'
+        SQLITE_PRAGMAS = pragmas
+        SQLALCHEMY_ENGINE_OPTIONS = opcoes
+        INSTRUMENTACAO_ATIVA = False
+
+    config['benchmark'] = BenchmarkConfig
+    return create_app('benchmark')
+
+def gerar_banco(caminho_db, usuarios):
+    from app import db
+    from seed import GeradorDados
+
+    app = criar_app(caminho_db, 'padrão')
+    with app.app_context():
+        GeradorDados(usuarios=usuarios, desafios=50, resultados_por_usuario=5, pool_senhas=1).executar()
+        db.engine.dispose()
+
+def trabalhar(caminho_db, perfil, papel, duracao, semente):
+    """Executa operações de leitura ou escrita até o fim da duração; retorna (operações, erros)"""
+    from app import db
+    from app.identidade import criar_token_acesso
+    from app.models import Usuario, Desafio
+
+    app = criar_app(caminho_db, perfil)
+    rng = random.Random(semente)
+    with app.app_context():
+        usuarios = [usuario_id for usuario_id, in db.session.query(Usuario.id)]
+        desafios = [desafio_id for desafio_id, in db.session.query(Desafio.id)]
+        tokens = {usuario_id: criar_token_acesso(db.session.get(Usuario, usuario_id))
+                  for usuario_id in rng.sample(usuarios, min(50, len(usuarios)))}
+        db.session.remove()
+
+    cliente = app.test_client()
+    operacoes = erros = 0
+    limite = time.perf_counter() + duracao
+    while time.perf_counter() < limite:
+        cabecalhos = {'Authorization': f'Bearer {tokens[rng.choice(list(tokens))]}'}
+        try:
+            if papel == 'leitor':
+                caminho = rng.choice(['/api/desafios', '/api/users/me', '/api/users/progresso'])
+                respostas = [cliente.get(caminho, headers=cabecalhos)]
+            else:
+                desafio_id = rng.choice(desafios)
+                respostas = [cliente.post(f'/api/desafios/{desafio_id}/iniciar', headers=cabecalhos),
+                             cliente.post(f'/api/desafios/{desafio_id}/concluir', headers=cabecalhos)]
+            if all(resposta.status_code < 500 for resposta in respostas):
+                operacoes += 1
+            else:
+                erros += 1
+        except Exception:
+            # Em modo de teste as exceções (ex.: "database is locked") chegam até aqui
+            erros += 1
+            with app.app_context():
+                db.session.remove()
+    return papel, operacoes, erros
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--leitores', type=int, default=4)
+    parser.add_argument('--escritores', type=int, default=2)
+    parser.add_argument('--duracao', type=float, default=10)
+    parser.add_argument('--users', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        original = os.path.join(diretorio, 'original.db')
+        gerar_banco(original, args.users)
+
+        print(f"\nleitores={args.leitores} escritores={args.escritores} duração={args.duracao}s")
+        print(f"{'perfil':10s} {'leituras/s':>11s} {'escritas/s':>11s} {'erros':>7s}")
+        for perfil in PERFIS:
+            # Cada perfil parte de uma cópia do mesmo banco (o modo WAL fica gravado no arquivo)
+            caminho_db = os.path.join(diretorio, f'{perfil}.db')
+            shutil.copy(original, caminho_db)
+
+            tarefas = [(caminho_db, perfil, 'leitor', args.duracao, indice) for indice in range(args.leitores)]
+            tarefas += [(caminho_db, perfil, 'escritor', args.duracao, 1000 + indice) for indice in range(args.escritores)]
+            with multiprocessing.Pool(len(tarefas)) as pool:
+                resultados = pool.starmap(trabalhar, tarefas)
+
+            leituras = sum(operacoes for papel, operacoes, _ in resultados if papel == 'leitor')
+            escritas = sum(operacoes for papel, operacoes, _ in resultados if papel == 'escritor')
+            erros = sum(erros for _, _, erros in resultados)
+            print(f"{perfil:10s} {leituras / args.duracao:11.1f} {escritas / args.duracao:11.1f} {erros:7d}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+"""
+Teste de carga HTTP de ponta a ponta da API
+
+Gera um banco sintético (seed.py), sobe create_app('testing') no gunicorn e executa cada cenário
+de tráfego por um tempo fixo, medindo latência (p50/p95/p99) e vazão por endpoint:
+
+    login      - tempestade de logins
+    dashboard  - carregamento do painel: /users/me, /users/progresso, /desafios/destaque e /desafios
+    quiz       - iniciar, submeter e concluir o quiz de um desafio
+
+O resultado também é gravado em JSON (com o commit atual) para comparar execuções.
+
+Uso:
+    python benchmarks/carga.py [--users 2000] [--challenges 100] [--results-per-user 20]
+                               [--workers 4] [--concorrencia 16] [--duracao 15]
+                               [--cenarios login,dashboard,quiz] [--saida carga-<commit>.json]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+DIRETORIO_BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, DIRETORIO_BACKEND)
+
+POOL_SENHAS = 8
+
+def gerar_banco(args):
+    """Cria o banco de testes com o gerador de dados sintéticos do seed"""
+    from app import create_app, db
+    from seed import GeradorDados
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        GeradorDados(
+            usuarios=args.users,
+            desafios=args.challenges,
+            resultados_por_usuario=args.results_per_user,
+            pool_senhas=POOL_SENHAS
+        ).executar()
+        db.engine.dispose()
+
+def porta_livre():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def iniciar_servidor(porta, workers, env, log, aplicacao="app:create_app('testing')", opcoes=(),
+                     caminho_pronto='/api/desafios/destaque'):
+    """Sobe o gunicorn com o gunicorn.conf.py do backend; `opcoes` sobrescrevem a configuração dele"""
+    processo = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{porta}',
+         '--log-level', 'warning', *opcoes, aplicacao],
+        cwd=DIRETORIO_BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=log
+    )
+    limite = time.time() + 30
+    while time.time() < limite:
+        if processo.poll() is not None:
+            raise SystemExit(f"O gunicorn terminou ao iniciar (código {processo.returncode}); veja {log.name}")
+        try:
+            requisitar(porta, 'GET', caminho_pronto)
+            return processo
+        except OSError:
+            time.sleep(0.2)
+    processo.terminate()
+    raise SystemExit("O gunicorn não respondeu em 30s")
+
+def requisitar(porta, metodo, caminho, corpo=None, token=None):
+    """Faz uma requisição e retorna (status, corpo decodificado, segundos)"""
+    cabecalhos = {'Content-Type': 'application/json'}
+    if token:
+        cabecalhos['Authorization'] = f'Bearer {token}'
+
+    inicio = time.perf_counter()
+    conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=30)
+    try:
+        conexao.request(metodo, caminho, body=json.dumps(corpo) if corpo is not None else None, headers=cabecalhos)
+        resposta = conexao.getresponse()
+        dados = resposta.read()
+    finally:
+        conexao.close()
+    duracao = time.perf_counter() - inicio
+
+    try:
+        dados = json.loads(dados) if dados else None
+    except ValueError:
+        pass
+    return resposta.status, dados, duracao
+
+class Medicoes:
+    """Latências e erros por endpoint, acumulados pelas threads de um cenário"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = {}
+        self.erros = {}
+
+    def registrar(self, rotulo, status, duracao):
+        with self._lock:
+            self.latencias.setdefault(rotulo, []).append(duracao)
+            if status >= 400:
+                self.erros[rotulo] = self.erros.get(rotulo, 0) + 1
+
+class Sessao:
+    """Cliente de um usuário virtual: faz as requisições e registra suas medições"""
+
+    def __init__(self, porta, medicoes, rng, contexto):
+        self.porta = porta
+        self.medicoes = medicoes
+        self.rng = rng
+        self.contexto = contexto
+
+    def chamar(self, rotulo, metodo, caminho, corpo=None, token=None):
+        try:
+            status, dados, duracao = requisitar(self.porta, metodo, caminho, corpo, token)
+        except OSError:
+            status, dados, duracao = 599, None, 0.0
+        self.medicoes.registrar(rotulo, status, duracao)
+        return status, dados
+
+def cenario_login(sessao):
+    usuario_id = sessao.rng.choice(sessao.contexto['usuarios'])
+    sessao.chamar('POST /api/auth/login', 'POST', '/api/auth/login', credenciais(usuario_id))
+
+def cenario_dashboard(sessao):
+    token = sessao.rng.choice(sessao.contexto['tokens'])
+    sessao.chamar('GET /api/users/me', 'GET', '/api/users/me', token=token)
+    sessao.chamar('GET /api/users/progresso', 'GET', '/api/users/progresso', token=token)
+    sessao.chamar('GET /api/desafios/destaque', 'GET', '/api/desafios/destaque', token=token)
+    sessao.chamar('GET /api/desafios', 'GET', '/api/desafios', token=token)
+
+def cenario_quiz(sessao):
+    token = sessao.rng.choice(sessao.contexto['tokens'])
+    desafio_id, num_perguntas = sessao.rng.choice(sessao.contexto['desafios'])
+    respostas = {str(pergunta): sessao.rng.randint(0, 3) for pergunta in range(1, num_perguntas + 1)}
+
+    sessao.chamar('POST /api/desafios/<id>/iniciar', 'POST', f'/api/desafios/{desafio_id}/iniciar', token=token)
+    sessao.chamar('POST /api/desafios/<id>/submeter', 'POST', f'/api/desafios/{desafio_id}/submeter',
+                  {'respostasQuiz': respostas}, token=token)
+    sessao.chamar('POST /api/desafios/<id>/concluir', 'POST', f'/api/desafios/{desafio_id}/concluir', token=token)
+
+CENARIOS = {
+    'login': cenario_login,
+    'dashboard': cenario_dashboard,
+    'quiz': cenario_quiz,
+}
+
+def credenciais(usuario_id):
+    return {'email': f'usuario{usuario_id}@carga.humaniq.local', 'senha': f'senha{usuario_id % POOL_SENHAS}'}
+
+def preparar_contexto(porta, args):
+    """Escolhe os usuários e desafios do teste e faz login de um conjunto de sessões"""
+    from app import create_app, db
+    from app.models import Desafio, Usuario
+
+    app = create_app('testing')
+    with app.app_context():
+        usuarios = [usuario_id for usuario_id, in db.session.query(Usuario.id)
+                    .filter(Usuario.email.like('%@carga.humaniq.local'))]
+        desafios = [(desafio.id, len(desafio.perguntas or [])) for desafio in Desafio.query.filter_by(status='ativo')]
+        db.engine.dispose()
+
+    rng = random.Random(args.semente)
+    tokens = []
+    for usuario_id in rng.sample(usuarios, min(args.sessoes, len(usuarios))):
+        status, dados, _ = requisitar(porta, 'POST', '/api/auth/login', credenciais(usuario_id))
+        if status == 200:
+            tokens.append(dados['access_token'])
+    if not tokens:
+        raise SystemExit("Nenhum login de preparação foi bem-sucedido")
+
+    return {'usuarios': usuarios, 'desafios': desafios, 'tokens': tokens}
+
+def executar_cenario(cenario, porta, contexto, args):
+    medicoes = Medicoes()
+    limite = time.perf_counter() + args.duracao
+
+    def usuario_virtual(indice):
+        sessao = Sessao(porta, medicoes, random.Random(args.semente * 1000 + indice), contexto)
+        while time.perf_counter() < limite:
+            cenario(sessao)
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=usuario_virtual, args=(indice,)) for indice in range(args.concorrencia)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return medicoes, time.perf_counter() - inicio
+
+def percentil(valores_ordenados, p):
+    """Percentil pelo método do posto mais próximo"""
+    if not valores_ordenados:
+        return 0.0
+    posicao = max(0, min(len(valores_ordenados) - 1, int(round(p / 100 * len(valores_ordenados))) - 1))
+    return valores_ordenados[posicao]
+
+def resumir(medicoes, duracao):
+    endpoints = {}
+    for rotulo, latencias in sorted(medicoes.latencias.items()):
+        latencias.sort()
+        endpoints[rotulo] = {
+            'requisicoes': len(latencias),
+            'erros': medicoes.erros.get(rotulo, 0),
+            'vazao_rps': round(len(latencias) / duracao, 2),
+            'media_ms': round(sum(latencias) / len(latencias) * 1000, 2),
+            'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+            'p95_ms': round(percentil(latencias, 95) * 1000, 2),
+            'p99_ms': round(percentil(latencias, 99) * 1000, 2),
+        }
+    total = sum(endpoint['requisicoes'] for endpoint in endpoints.values())
+    return {
+        'duracao_s': round(duracao, 2),
+        'requisicoes': total,
+        'erros': sum(endpoint['erros'] for endpoint in endpoints.values()),
+        'vazao_rps': round(total / duracao, 2),
+        'endpoints': endpoints,
+    }
+
+def imprimir(nome, resumo):
+    print(f"\n== {nome}: {resumo['requisicoes']} requisições, {resumo['vazao_rps']} req/s, {resumo['erros']} erros")
+    print(f"{'endpoint':38s} {'req/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'erros':>6s}")
+    for rotulo, endpoint in resumo['endpoints'].items():
+        print(f"{rotulo:38s} {endpoint['vazao_rps']:8.1f} {endpoint['p50_ms']:8.1f} "
+              f"{endpoint['p95_ms']:8.1f} {endpoint['p99_ms']:8.1f} {endpoint['erros']:6d}")
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=DIRETORIO_BACKEND,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconhecido'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--challenges', type=int, default=100)
+    parser.add_argument('--results-per-user', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=4, help='Workers do gunicorn')
+    parser.add_argument('--concorrencia', type=int, default=16, help='Usuários virtuais simultâneos')
+    parser.add_argument('--duracao', type=float, default=15, help='Segundos de execução de cada cenário')
+    parser.add_argument('--sessoes', type=int, default=200, help='Usuários autenticados usados em dashboard e quiz')
+    parser.add_argument('--cenarios', default=','.join(CENARIOS))
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', help='Arquivo JSON de resultado (padrão: carga-<commit>.json)')
+    args = parser.parse_args()
+
+    cenarios = [nome.strip() for nome in args.cenarios.split(',') if nome.strip()]
+    desconhecidos = [nome for nome in cenarios if nome not in CENARIOS]
+    if desconhecidos:
+        parser.error(f"Cenários desconhecidos: {', '.join(desconhecidos)}")
+
+    commit = commit_atual()
+    with tempfile.TemporaryDirectory() as diretorio:
+        env = dict(os.environ, TEST_DATABASE_URL=f"sqlite:///{os.path.join(diretorio, 'carga.db')}")
+        os.environ['TEST_DATABASE_URL'] = env['TEST_DATABASE_URL']
+
+        print(f"Gerando banco: {args.users} usuários, {args.challenges} desafios, "
+              f"{args.results_per_user} resultados por usuário")
+        gerar_banco(args)
+
+        porta = porta_livre()
+        with open(os.path.join(diretorio, 'gunicorn.log'), 'w') as log:
+            servidor = iniciar_servidor(porta, args.workers, env, log)
+            try:
+                contexto = preparar_contexto(porta, args)
+                resultados = {}
+                for nome in cenarios:
+                    medicoes, duracao = executar_cenario(CENARIOS[nome], porta, contexto, args)
+                    resultados[nome] = resumir(medicoes, duracao)
+                    imprimir(nome, resumo=resultados[nome])
+            finally:
+                servidor.terminate()
+                servidor.wait()
+
+    saida = args.saida or f'carga-{commit}.json'
+    with open(saida, 'w') as arquivo:
+        json.dump({
+            'commit': commit,
+            'data': datetime.utcnow().isoformat(),
+            'parametros': vars(args),
+            'cenarios': resultados,
+        }, arquivo, indent=2, ensure_ascii=False)
+    print(f"\nResultado gravado em {saida}")
+
+if __name__ == '__main__':
+    main()
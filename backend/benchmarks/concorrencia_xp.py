@@ -0,0 +1,147 @@
+"""
+Teste de estresse da conclusão de desafios concorrente
+
+Várias threads concluem os mesmos desafios do mesmo usuário ao mesmo tempo (como abas repetidas
+ou requisições reenviadas). Ao final, cada desafio deve ter concedido XP exatamente uma vez:
+xp_total = 10 * desafios, nível/XP coerentes e estatísticas sem conclusões perdidas ou duplicadas.
+
+Uso:
+    python benchmarks/concorrencia_xp.py [--threads 16] [--desafios 50]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from config import config, TestingConfig
+from app import create_app, db
+from sqlalchemy import func
+from app.models import Usuario, Desafio, Resultado, EstatisticaUsuario, ProgressoPeriodo, XP_POR_DESAFIO
+from app.identidade import criar_token_acesso
+
+def criar_app(caminho_db):
+    class BenchmarkConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{caminho_db}'
+        # Escritas concorrentes no SQLite esperam o bloqueio em vez de falhar
+        SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 60}}
+        # A espera pelo bloqueio de escrita é esperada aqui; não logar como requisição lenta
+        REQUISICAO_LENTA_MS = float('inf')
+
+    config['benchmark'] = BenchmarkConfig
+    return create_app('benchmark')
+
+def preparar(app, quantidade):
+    """Usuário com `quantidade` desafios em andamento; retorna o id, o token e os ids dos desafios"""
+    with app.app_context():
+        usuario = Usuario(nome='Estresse', email='estresse@humaniq.local', senha='senha-estresse')
+        db.session.add(usuario)
+        db.session.flush()
+
+        desafios = [Desafio(titulo=f'Desafio {numero}', descricao='Estresse', status='ativo', perguntas=[])
+                    for numero in range(quantidade)]
+        db.session.add_all(desafios)
+        db.session.flush()
+
+        db.session.add_all(Resultado(usuario_id=usuario.id, desafio_id=desafio.id, status='em_andamento',
+                                     data_inicio=datetime.utcnow()) for desafio in desafios)
+        db.session.commit()
+        return usuario.id, criar_token_acesso(usuario), [desafio.id for desafio in desafios]
+
+def concluir_todos(app, token, desafios, semente=0, barreira=None):
+    """Conclui os desafios em ordem aleatória; retorna (status, mensagem) de cada requisição"""
+    cliente = app.test_client()
+    ordem = list(desafios)
+    random.Random(semente).shuffle(ordem)
+    if barreira is not None:
+        barreira.wait()
+    respostas = []
+    for desafio_id in ordem:
+        resposta = cliente.post(f'/api/desafios/{desafio_id}/concluir', headers={'Authorization': f'Bearer {token}'})
+        respostas.append((resposta.status_code, (resposta.get_json() or {}).get('message')))
+    return respostas
+
+def estressar(app, token, desafios, threads):
+    barreira = threading.Barrier(threads)
+    respostas = Counter()
+    lock = threading.Lock()
+
+    def trabalhador(indice):
+        obtidas = concluir_todos(app, token, desafios, indice, barreira)
+        with lock:
+            respostas.update(obtidas)
+
+    inicio = time.perf_counter()
+    trabalhadores = [threading.Thread(target=trabalhador, args=(indice,)) for indice in range(threads)]
+    for thread in trabalhadores:
+        thread.start()
+    for thread in trabalhadores:
+        thread.join()
+    return respostas, time.perf_counter() - inicio
+
+def estado_final(app, usuario_id):
+    """XP, nível e contadores do usuário depois das conclusões"""
+    with app.app_context():
+        usuario = db.session.get(Usuario, usuario_id)
+        estatisticas = db.session.get(EstatisticaUsuario, usuario_id)
+        return {
+            'xp_total': usuario.xp_total,
+            'nivel': usuario.nivel,
+            'xp no nível': usuario.xp,
+            'resultados concluídos': Resultado.query.filter_by(usuario_id=usuario_id, status='concluído').count(),
+            'estatísticas: desafios concluídos': estatisticas.desafios_concluidos,
+            'progresso: conclusões por dia': db.session.query(func.sum(ProgressoPeriodo.conclusoes)).filter_by(
+                usuario_id=usuario_id, granularidade='dia').scalar(),
+        }
+
+def verificar(app, usuario_id, quantidade, respostas):
+    esperado = quantidade * XP_POR_DESAFIO
+    nivel = Usuario.calcular_nivel(esperado)
+    esperados = {
+        'xp_total': esperado,
+        'nivel': nivel,
+        'xp no nível': esperado - Usuario.calcular_xp_total(nivel, 0),
+        'resultados concluídos': quantidade,
+        'estatísticas: desafios concluídos': quantidade,
+        'progresso: conclusões por dia': quantidade,
+    }
+    verificacoes = [('conclusões com sucesso', respostas[(200, 'Desafio concluído com sucesso')], quantidade)]
+    verificacoes += [(descricao, obtido, esperados[descricao]) for descricao, obtido in estado_final(app, usuario_id).items()]
+
+    ok = True
+    for descricao, obtido, esperado in verificacoes:
+        correto = obtido == esperado
+        ok = ok and correto
+        print(f"[{'OK' if correto else 'FALHA'}] {descricao}: {obtido} (esperado {esperado})")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--desafios', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        app = criar_app(os.path.join(diretorio, 'estresse.db'))
+        usuario_id, token, desafios = preparar(app, args.desafios)
+
+        respostas, duracao = estressar(app, token, desafios, args.threads)
+        total = sum(respostas.values())
+        print(f"{total} requisições de {args.threads} threads em {duracao:.2f}s ({total / duracao:.0f} req/s)")
+        for (status, mensagem), quantidade in sorted(respostas.items(), key=lambda item: str(item[0])):
+            print(f"  {status} {mensagem}: {quantidade}")
+
+        ok = verificar(app, usuario_id, args.desafios, respostas)
+        with app.app_context():
+            db.engine.dispose()
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -11,9 +11,84 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key-dev')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    # Como /auth/verificar e /users/initial-test-status usam as claims do token:
+    #   'desligado' - sempre carregam o usuário do banco
+    #   'versao'    - confiam nas claims se a versão do perfil no banco for a mesma do token
+    #   'token'     - confiam nas claims sem consultar o banco
+    JWT_CLAIMS_MODO = os.environ.get('JWT_CLAIMS_MODO', 'versao')
+    
+    # Hash de senhas: método/custo no formato do werkzeug (ex.: 'pbkdf2:sha256:600000', 'scrypt:32768:8:1').
+    # Hashes gerados com outro método são atualizados no próximo login bem-sucedido.
+    SENHA_METODO = os.environ.get('SENHA_METODO', 'pbkdf2:sha256:600000')
+    SENHA_SALT_LENGTH = 16
+    # Hashes simultâneos somando todos os workers da máquina (0 desliga o limite) e espera máxima,
+    # em segundos, por uma vaga antes de responder 503 com Retry-After
+    SENHA_LIMITE_GLOBAL = int(os.environ.get('SENHA_LIMITE_GLOBAL', os.cpu_count() or 2))
+    SENHA_ESPERA_MAX = float(os.environ.get('SENHA_ESPERA_MAX', 2))
+    SENHA_LIMITE_DIRETORIO = os.environ.get('SENHA_LIMITE_DIRETORIO')
+    # Processos dedicados ao hashing em cada worker (0 calcula na thread da requisição) e prazo do cálculo
+    SENHA_POOL_PROCESSOS = int(os.environ.get('SENHA_POOL_PROCESSOS', 0))
+    SENHA_POOL_TIMEOUT = float(os.environ.get('SENHA_POOL_TIMEOUT', 10))
+    
+    # Réplica de leitura opcional: as leituras das requisições GET vão para ela, exceto durante
+    # REPLICA_JANELA_ESCRITA segundos depois de uma escrita do mesmo cliente (ler as próprias escritas)
+    SQLALCHEMY_BINDS = {'replica': os.environ['DATABASE_REPLICA_URL']} if os.environ.get('DATABASE_REPLICA_URL') else {}
+    REPLICA_JANELA_ESCRITA = int(os.environ.get('REPLICA_JANELA_ESCRITA', 5))
+    
+    # PRAGMAs executados em cada nova conexão SQLite (vazio mantém os padrões do SQLite)
+    SQLITE_PRAGMAS = {}
     
     # Configurações CORS
     CORS_HEADERS = 'Content-Type'
+    
+    # Intervalo (em segundos) entre verificações da versão do catálogo de perguntas em cache
+    CATALOGO_CACHE_TTL = int(os.environ.get('CATALOGO_CACHE_TTL', 30))
+    
+    # Paginação da listagem de desafios
+    DESAFIOS_POR_PAGINA = 20
+    DESAFIOS_POR_PAGINA_MAX = 100
+    
+    # Paginação das coleções (avaliações e resultados) incluídas no perfil
+    COLECOES_PERFIL_POR_PAGINA = 50
+    COLECOES_PERFIL_POR_PAGINA_MAX = 200
+    
+    # Quantidade máxima de períodos (dias ou semanas) retornados pela série de progresso
+    SERIE_PROGRESSO_MAX_PERIODOS = 366
+    
+    # Rankings em memória: intervalo (em segundos) para remontá-los a partir do banco, trazendo
+    # as alterações feitas por outros workers, e tamanhos de página
+    RANKING_TTL = int(os.environ.get('RANKING_TTL', 300))
+    RANKING_POR_PAGINA = 20
+    RANKING_POR_PAGINA_MAX = 100
+    RANKING_VIZINHOS_MAX = 25
+    
+    # Quantidade máxima de submissões aceitas em uma sincronização offline
+    SYNC_MAX_ITENS = 200
+    
+    # Serialização JSON das respostas com o orjson, quando instalado (0 usa o json da biblioteca padrão)
+    JSON_RAPIDO = os.environ.get('JSON_RAPIDO', '1') == '1'
+    
+    # Compressão gzip/brotli das respostas negociada pelo Accept-Encoding, a partir de COMPRESSAO_MINIMO
+    # bytes. Os bytes comprimidos de respostas com ETag forte ficam em cache (COMPRESSAO_CACHE_ITENS; 0 desliga)
+    COMPRESSAO_ATIVA = os.environ.get('COMPRESSAO_ATIVA', '1') == '1'
+    COMPRESSAO_MINIMO = int(os.environ.get('COMPRESSAO_MINIMO', 1024))
+    COMPRESSAO_NIVEL_GZIP = int(os.environ.get('COMPRESSAO_NIVEL_GZIP', 6))
+    COMPRESSAO_NIVEL_BROTLI = int(os.environ.get('COMPRESSAO_NIVEL_BROTLI', 4))
+    COMPRESSAO_CACHE_ITENS = int(os.environ.get('COMPRESSAO_CACHE_ITENS', 256))
+    
+    # Instrumentação das requisições (Server-Timing e contagem de consultas SQL) e limite, em ms,
+    # acima do qual a requisição é logada com a lista de consultas executadas
+    INSTRUMENTACAO_ATIVA = os.environ.get('INSTRUMENTACAO_ATIVA', '1') == '1'
+    REQUISICAO_LENTA_MS = float(os.environ.get('REQUISICAO_LENTA_MS', 500))
+    
+    # Perfil (cProfile + pilhas amostradas) de requisições em produção. Desligado, nenhum hook é registrado.
+    # Com PERFIL_CHAVE definida, requisições com um token válido no cabeçalho X-Perfil
+    # (gerado com `flask token-perfil`) são perfiladas; PERFIL_AMOSTRAGEM perfila uma fração aleatória.
+    PERFIL_ATIVO = os.environ.get('PERFIL_ATIVO', '0') == '1'
+    PERFIL_CHAVE = os.environ.get('PERFIL_CHAVE')
+    PERFIL_AMOSTRAGEM = float(os.environ.get('PERFIL_AMOSTRAGEM', 0))
+    PERFIL_DIRETORIO = os.environ.get('PERFIL_DIRETORIO')  # padrão: instance/perfis
+    PERFIL_INTERVALO_MS = 5
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -21,10 +96,31 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     DEBUG = False
     # Em produção, use variáveis de ambiente para as chaves secretas
+    
+    # Perfil de desempenho do SQLite: com WAL, leitores não bloqueiam o escritor (e vice-versa);
+    # synchronous=NORMAL só faz fsync nos checkpoints; busy_timeout espera o bloqueio de escrita
+    # em vez de falhar com "database is locked"; mmap e cache reduzem as leituras do disco
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # em KiB: 64 MiB
+        'temp_store': 'MEMORY',
+    }
+    # Conexões reaproveitadas entre requisições; com WAL várias podem ler ao mesmo tempo
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_POOL_MAX_OVERFLOW', 5)),
+        'pool_timeout': 10,
+    }
 
 class TestingConfig(Config):
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///test.db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite:///test.db')
+    SENHA_METODO = 'pbkdf2:sha256:1000'
+    SENHA_POOL_PROCESSOS = 0
+    SENHA_LIMITE_GLOBAL = 0
 
 config = {
     'development': DevelopmentConfig,
@@ -0,0 +1,26 @@
+# Configuração do gunicorn (carregada automaticamente a partir deste diretório)
+import os
+import shutil
+import tempfile
+
+# Cada worker grava suas métricas neste diretório e o /metrics soma todas elas.
+# A variável precisa existir antes de o prometheus_client ser importado.
+diretorio_metricas = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'humaniq-metricas')
+)
+
+def on_starting(server):
+    # Descarta as métricas de execuções anteriores
+    shutil.rmtree(diretorio_metricas, ignore_errors=True)
+    os.makedirs(diretorio_metricas)
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+# Workers com threads: enquanto uma requisição calcula um hash de senha (o hashlib libera o GIL),
+# as outras threads do mesmo worker continuam atendendo. O total de hashes simultâneos na máquina
+# é limitado à parte por SENHA_LIMITE_GLOBAL (app/senhas.py).
+worker_class = 'gthread'
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
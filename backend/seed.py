@@ -1,7 +1,16 @@
-import os
-from flask import Flask
-from app import create_app, db
-from app.models import Usuario, PerguntaTeste, Desafio
+import argparse
+import random
+import time
+from sqlalchemy import func, insert, text
+from sqlalchemy.orm import load_only
+from app import create_app, db, senhas
+from app.models import (
+    Usuario, PerguntaTeste, Desafio, Avaliacao, MediaCategoriaAvaliacao, Resultado, EstatisticaUsuario,
+    ProgressoPeriodo, XP_POR_DESAFIO
+)
+from app.catalogo import catalogo_perguntas
+from app.pontuacao import GabaritoQuiz
+from app.resources.assessment import calcular_pontuacao, gerar_feedback
 from datetime import datetime, timedelta, timezone
 
 def seed_perguntas_teste():
@@ -136,14 +145,263 @@ def seed_database():
     
     print("População do banco de dados concluída com sucesso!")
 
+class GeradorDados:
+    """
+    Gera um conjunto de dados sintético (usuários, desafios, avaliações e resultados) e o grava
+    com inserts em lote. As senhas vêm de um pool pré-calculado: o usuário N usa a senha
+    'senha{N % tamanho_pool}'.
+    """
+
+    def __init__(self, usuarios, desafios, resultados_por_usuario, avaliacoes_por_usuario=1,
+                 lote=10000, pool_senhas=8, semente=42, dias_historico=730):
+        self.usuarios = usuarios
+        self.desafios = desafios
+        self.resultados_por_usuario = resultados_por_usuario
+        self.avaliacoes_por_usuario = avaliacoes_por_usuario
+        self.lote = lote
+        self.pool_senhas = pool_senhas
+        self.random = random.Random(semente)
+        self.agora = datetime.utcnow()
+        self.inicio_historico = self.agora - timedelta(days=dias_historico)
+        self.buffers = {}
+        self.total_linhas = 0
+        self.proximo_id_avaliacao = None
+
+    def proximo_id(self, modelo):
+        return (db.session.query(func.max(modelo.id)).scalar() or 0) + 1
+
+    def adicionar(self, modelo, linha):
+        """Acumula a linha; os lotes são gravados por gravar_se_cheio, entre um usuário e outro"""
+        self.buffers.setdefault(modelo, []).append(linha)
+
+    def gravar_se_cheio(self):
+        """
+        Grava os lotes quando algum deles atinge o tamanho configurado. Só é chamada entre usuários
+        (ou desafios), quando as linhas referenciadas pelas pendentes já estão nos buffers
+        """
+        if any(len(buffer) >= self.lote for buffer in self.buffers.values()):
+            self.gravar_tudo()
+
+    def gravar(self, modelo):
+        buffer = self.buffers.get(modelo)
+        if buffer:
+            db.session.execute(insert(modelo.__table__), buffer)
+            self.total_linhas += len(buffer)
+            buffer.clear()
+
+    def gravar_tudo(self):
+        # Ordem respeitando as chaves estrangeiras
+        for modelo in (Desafio, Usuario, EstatisticaUsuario, ProgressoPeriodo, Avaliacao, MediaCategoriaAvaliacao,
+                       Resultado):
+            self.gravar(modelo)
+        db.session.commit()
+
+    def data_aleatoria(self, inicio, fim):
+        return inicio + (fim - inicio) * self.random.random()
+
+    def gerar_desafios(self):
+        primeiro_id = self.proximo_id(Desafio)
+        desafios = []
+        for desafio_id in range(primeiro_id, primeiro_id + self.desafios):
+            perguntas = []
+            for pergunta_id in range(1, self.random.randint(3, 5) + 1):
+                opcoes = [f"Opção {letra} da pergunta {pergunta_id}" for letra in 'ABCD']
+                perguntas.append({
+                    'id': pergunta_id,
+                    'texto': f"Pergunta {pergunta_id} do desafio {desafio_id}",
+                    'opcoes': opcoes,
+                    'resposta_correta': self.random.choice(opcoes)
+                })
+            data_criacao = self.data_aleatoria(self.inicio_historico, self.agora)
+            desafios.append((desafio_id, GabaritoQuiz(None, perguntas)))
+            self.adicionar(Desafio, {
+                'id': desafio_id,
+                'titulo': f"Desafio sintético {desafio_id}",
+                'descricao': "Desafio gerado automaticamente para testes de carga.",
+                'video_url': None,
+                'status': 'ativo' if self.random.random() < 0.9 else 'inativo',
+                'data_criacao': data_criacao,
+                'data_atualizacao': data_criacao,
+                'prazo': data_criacao + timedelta(days=7),
+                'perguntas': perguntas,
+                'desafio_pratico': "Descreva como você aplicou o conteúdo do desafio no seu dia a dia."
+            })
+            self.gravar_se_cheio()
+        self.gravar_tudo()
+        return desafios
+
+    def dias_de_atividade(self, inicio):
+        """Gera dias de atividade em sequências (dias consecutivos) separadas por pausas"""
+        dia = inicio.date()
+        fim = self.agora.date()
+        while dia <= fim:
+            for _ in range(int(self.random.expovariate(1 / 3)) + 1):
+                if dia > fim:
+                    return
+                yield dia
+                dia += timedelta(days=1)
+            dia += timedelta(days=int(self.random.expovariate(1 / 4)) + 1)
+
+    def responder_quiz(self, gabarito):
+        """Respostas do quiz de um desafio, acertando a maioria das perguntas do gabarito"""
+        acertos = min(gabarito.total, int(self.random.triangular(0, gabarito.total + 1, gabarito.total)))
+        certas = set(self.random.sample(range(gabarito.total), acertos))
+        respostas = {}
+        for posicao, (pergunta_id, indice_correto, num_opcoes) in enumerate(gabarito.chave):
+            erradas = [indice for indice in range(num_opcoes) if indice != indice_correto]
+            if posicao in certas and indice_correto >= 0:
+                respostas[pergunta_id] = indice_correto
+            elif erradas:
+                respostas[pergunta_id] = self.random.choice(erradas)
+        return respostas
+
+    def gerar_usuario(self, usuario_id, hashes, desafios, catalogo):
+        data_cadastro = self.data_aleatoria(self.inicio_historico, self.agora - timedelta(days=1))
+        quantidade = min(self.resultados_por_usuario, len(desafios))
+        escolhidos = self.random.sample(desafios, quantidade)
+
+        # Distribui as conclusões pelos dias de atividade (vários desafios podem cair no mesmo dia)
+        dias = list(self.dias_de_atividade(data_cadastro))
+        conclusoes = []
+        resultados = []
+        pontos = 0
+        for desafio_id, gabarito in escolhidos:
+            concluido = self.random.random() < 0.85
+            dia = self.random.choice(dias)
+            data_inicio = datetime.combine(dia, datetime.min.time()) + timedelta(seconds=self.random.randint(0, 86399))
+            respostas = self.responder_quiz(gabarito)
+            pontuacao = gabarito.corrigir(respostas)
+            data_conclusao = None
+            if concluido:
+                data_conclusao = min(data_inicio + timedelta(minutes=self.random.randint(5, 240)), self.agora)
+                conclusoes.append((data_conclusao, pontuacao))
+                pontos += pontuacao
+            resultados.append({
+                'usuario_id': usuario_id,
+                'desafio_id': desafio_id,
+                'status': 'concluído' if concluido else self.random.choice(['pendente', 'em_andamento']),
+                'data_inicio': data_inicio,
+                'data_conclusao': data_conclusao,
+                'respostas_quiz': respostas,
+                'pontuacao': pontuacao
+            })
+
+        # XP e nível coerentes com os desafios concluídos
+        xp_total = len(conclusoes) * XP_POR_DESAFIO
+        nivel = Usuario.calcular_nivel(xp_total)
+        xp = xp_total - Usuario.calcular_xp_total(nivel, 0)
+
+        teste_concluido = self.avaliacoes_por_usuario > 0
+        self.adicionar(Usuario, {
+            'id': usuario_id,
+            'nome': f"Usuário Sintético {usuario_id}",
+            'email': f"usuario{usuario_id}@carga.humaniq.local",
+            'senha_hash': hashes[usuario_id % len(hashes)],
+            'data_cadastro': data_cadastro,
+            'teste_inicial_concluido': teste_concluido,
+            'nivel': nivel,
+            'xp': xp,
+            'xp_total': xp_total,
+            'versao_perfil': 1
+        })
+        # O usuário entra no buffer antes das linhas que o referenciam
+        for resultado in resultados:
+            self.adicionar(Resultado, resultado)
+
+        dias_concluidos = sorted((data.date() for data, _ in conclusoes), reverse=True)
+        self.adicionar(EstatisticaUsuario, {
+            'usuario_id': usuario_id,
+            'desafios_concluidos': len(conclusoes),
+            'sequencia_atual': EstatisticaUsuario.calcular_sequencia_historico(dias_concluidos),
+            'data_ultima_conclusao': dias_concluidos[0] if dias_concluidos else None,
+            'pontos_quiz_total': pontos
+        })
+        for linha in ProgressoPeriodo.agregar(usuario_id, conclusoes, XP_POR_DESAFIO):
+            self.adicionar(ProgressoPeriodo, linha)
+
+        for _ in range(self.avaliacoes_por_usuario):
+            avaliacao_id = self.proximo_id_avaliacao
+            self.proximo_id_avaliacao += 1
+            respostas = {pergunta_id: self.random.randint(1, 5) for pergunta_id in catalogo.ordem}
+            media = calcular_pontuacao(respostas)
+            self.adicionar(Avaliacao, {
+                'id': avaliacao_id,
+                'usuario_id': usuario_id,
+                'data': self.data_aleatoria(data_cadastro, self.agora),
+                'pontuacao': int(media * 20),
+                'feedback': gerar_feedback(media),
+                'respostas': respostas
+            })
+            for categoria, valor in Avaliacao.medias_por_categoria(respostas, catalogo.categorias_por_pergunta).items():
+                self.adicionar(MediaCategoriaAvaliacao, {'avaliacao_id': avaliacao_id, 'categoria': categoria, 'media': valor})
+
+    def executar(self):
+        inicio = time.perf_counter()
+        seed_perguntas_teste()
+        catalogo = catalogo_perguntas.obter()
+
+        if db.engine.dialect.name == 'sqlite':
+            # Carga descartável: dispensa o fsync a cada commit
+            db.session.execute(text("PRAGMA synchronous=OFF"))
+
+        print(f"Pré-calculando {self.pool_senhas} hashes de senha...")
+        hashes = [senhas.gerar_hash(f"senha{i}") for i in range(self.pool_senhas)]
+
+        print(f"Gerando {self.desafios} desafios...")
+        desafios = self.gerar_desafios() if self.desafios else \
+            [(d.id, GabaritoQuiz(None, d.perguntas)) for d in Desafio.query.options(load_only(Desafio.id, Desafio.perguntas))]
+        if not desafios and self.resultados_por_usuario:
+            raise SystemExit("Nenhum desafio disponível para gerar resultados.")
+
+        print(f"Gerando {self.usuarios} usuários...")
+        primeiro_usuario = self.proximo_id(Usuario)
+        self.proximo_id_avaliacao = self.proximo_id(Avaliacao)
+        for numero, usuario_id in enumerate(range(primeiro_usuario, primeiro_usuario + self.usuarios), start=1):
+            self.gerar_usuario(usuario_id, hashes, desafios, catalogo)
+            self.gravar_se_cheio()
+            if numero % 10000 == 0:
+                print(f"  {numero} usuários gerados ({time.perf_counter() - inicio:.0f}s)")
+
+        self.gravar_tudo()
+        duracao = time.perf_counter() - inicio
+        print(f"Dados sintéticos gravados: {self.total_linhas} linhas em {duracao:.1f}s "
+              f"({self.total_linhas / duracao:.0f} linhas/s).")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Popula o banco de dados do HUMANIQ")
+    parser.add_argument('--config', default='development', help="Configuração da aplicação (development, testing, production)")
+    gerador = parser.add_argument_group("gerador de dados sintéticos")
+    gerador.add_argument('--users', type=int, default=0, help="Quantidade de usuários a gerar")
+    gerador.add_argument('--challenges', type=int, default=0, help="Quantidade de desafios a gerar (0 usa os existentes)")
+    gerador.add_argument('--results-per-user', type=int, default=0, help="Resultados de desafios por usuário")
+    gerador.add_argument('--assessments-per-user', type=int, default=1, help="Avaliações do teste inicial por usuário")
+    gerador.add_argument('--batch-size', type=int, default=10000, help="Linhas por insert em lote")
+    gerador.add_argument('--password-pool', type=int, default=8, help="Quantidade de hashes de senha pré-calculados")
+    gerador.add_argument('--random-seed', type=int, default=42, help="Semente para dados reproduzíveis")
+    return parser.parse_args()
+
 if __name__ == '__main__':
-    # Criar a aplicação com configuração de desenvolvimento
-    app = create_app('development')
+    args = parse_args()
+
+    # Criar a aplicação com a configuração escolhida (development por padrão)
+    app = create_app(args.config)
     
     # Criar contexto da aplicação
     with app.app_context():
         # Criar todas as tabelas
         db.create_all()
         
-        # Popular o banco de dados
-        seed_database()
+        if args.users or args.challenges:
+            # Modo gerador: dados sintéticos em volume
+            GeradorDados(
+                usuarios=args.users,
+                desafios=args.challenges,
+                resultados_por_usuario=args.results_per_user,
+                avaliacoes_por_usuario=args.assessments_per_user,
+                lote=args.batch_size,
+                pool_senhas=args.password_pool,
+                semente=args.random_seed
+            ).executar()
+        else:
+            # Popular o banco de dados
+            seed_database()
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from config import config, TestingConfig
+from app import create_app, db
+
+@pytest.fixture
+def criar_app(tmp_path):
+    """Cria aplicações de teste, cada uma com o próprio banco SQLite temporário"""
+    aplicacoes = []
+
+    def criar(nome='banco', **opcoes):
+        """`opcoes` sobrescrevem as configurações de TestingConfig"""
+        class ConfigTeste(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / f'{nome}.db'}"
+            INSTRUMENTACAO_ATIVA = False
+
+        for chave, valor in opcoes.items():
+            setattr(ConfigTeste, chave, valor)
+        config['pytest'] = ConfigTeste
+        app = create_app('pytest')
+        aplicacoes.append(app)
+        return app
+
+    yield criar
+
+    for app in aplicacoes:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
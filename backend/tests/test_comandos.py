@@ -0,0 +1,35 @@
+from app import db
+from app.commands import recorrigir_desafio
+from app.models import Desafio, Resultado, EstatisticaUsuario, ProgressoPeriodo
+from app.pontuacao import gabaritos
+from seed import GeradorDados
+
+def test_recorrigir_desafio_em_lotes(criar_app):
+    app = criar_app()
+    with app.app_context():
+        GeradorDados(usuarios=7, desafios=1, resultados_por_usuario=1, pool_senhas=1).executar()
+        # Gabarito corrigido: a resposta certa da primeira pergunta passa a ser outra opção
+        desafio = db.session.get(Desafio, 1)
+        perguntas = [dict(pergunta) for pergunta in desafio.perguntas]
+        opcoes = perguntas[0]['opcoes']
+        perguntas[0]['resposta_correta'] = opcoes[(opcoes.index(perguntas[0]['resposta_correta']) + 1) % len(opcoes)]
+        desafio.perguntas = perguntas
+        db.session.commit()
+
+    saida = app.test_cli_runner().invoke(recorrigir_desafio, ['1', '--lote', '2']).output
+    assert saida.startswith('7 submissão(ões) corrigida(s)')
+
+    with app.app_context():
+        gabarito = gabaritos.obter(1)
+        resultados = Resultado.query.all()
+        assert [resultado.pontuacao for resultado in resultados] == \
+            [gabarito.corrigir(resultado.respostas_quiz) for resultado in resultados]
+
+        pontos = {}
+        for resultado in resultados:
+            if resultado.status == 'concluído':
+                pontos[resultado.usuario_id] = pontos.get(resultado.usuario_id, 0) + resultado.pontuacao
+        for estatisticas in EstatisticaUsuario.query:
+            assert estatisticas.pontos_quiz_total == pontos.get(estatisticas.usuario_id, 0)
+        assert db.session.query(db.func.sum(ProgressoPeriodo.pontos)).filter_by(granularidade='dia').scalar() == \
+            sum(pontos.values())
@@ -0,0 +1,25 @@
+import pytest
+
+from app import db
+from app.identidade import criar_token_acesso
+from app.models import Usuario
+from seed import seed_database
+
+@pytest.mark.parametrize('codificacao', ['gzip', 'identity'])
+@pytest.mark.parametrize('caminho', ['/api/desafios/1', '/api/desafios/1/perguntas'])
+def test_304_tem_a_mesma_etag_e_vary_do_200(criar_app, codificacao, caminho):
+    app = criar_app()
+    with app.app_context():
+        seed_database()
+        token = criar_token_acesso(db.session.get(Usuario, 1))
+    cliente = app.test_client()
+    cabecalhos = {'Authorization': f'Bearer {token}', 'Accept-Encoding': codificacao}
+
+    resposta = cliente.get(caminho, headers=cabecalhos)
+    assert resposta.status_code == 200
+    etag = resposta.headers['ETag']
+
+    nao_modificada = cliente.get(caminho, headers={**cabecalhos, 'If-None-Match': etag})
+    assert nao_modificada.status_code == 304
+    assert nao_modificada.headers['ETag'] == etag
+    assert nao_modificada.headers['Vary'] == resposta.headers['Vary']
@@ -0,0 +1,24 @@
+from benchmarks.concorrencia_xp import preparar, concluir_todos, estressar, estado_final
+
+DESAFIOS = 20
+THREADS = 8
+
+SUCESSO = (200, 'Desafio concluído com sucesso')
+JA_CONCLUIDO = (200, 'Desafio já foi concluído anteriormente')
+
+def test_conclusoes_concorrentes_equivalem_as_seriais(criar_app):
+    # Escritas concorrentes no SQLite esperam o bloqueio em vez de falhar
+    opcoes = {'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': 60}}, 'REQUISICAO_LENTA_MS': float('inf')}
+
+    app_serial = criar_app('serial', **opcoes)
+    usuario_serial, token, desafios = preparar(app_serial, DESAFIOS)
+    assert concluir_todos(app_serial, token, desafios) == [SUCESSO] * DESAFIOS
+    esperado = estado_final(app_serial, usuario_serial)
+
+    app = criar_app('concorrente', **opcoes)
+    usuario_id, token, desafios = preparar(app, DESAFIOS)
+    respostas, _ = estressar(app, token, desafios, THREADS)
+
+    # Cada desafio concede XP uma única vez; as demais requisições o encontram já concluído
+    assert respostas == {SUCESSO: DESAFIOS, JA_CONCLUIDO: (THREADS - 1) * DESAFIOS}
+    assert estado_final(app, usuario_id) == esperado
@@ -0,0 +1,44 @@
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.identidade import criar_token_acesso
+from app.models import Usuario
+from seed import GeradorDados
+
+ROTAS = ('/api/users/profile', '/api/users/challenge-history')
+
+def contar_consultas(app, caminho, token):
+    """Quantidade de comandos SQL executados por uma requisição autenticada"""
+    comandos = []
+
+    def registrar(conexao, cursor, sql, parametros, contexto, executemany):
+        comandos.append(sql)
+
+    cliente = app.test_client()
+    cabecalhos = {'Authorization': f'Bearer {token}'}
+    # Aquecimento: caches em memória (catálogo de perguntas, gabaritos) não entram na contagem
+    assert cliente.get(caminho, headers=cabecalhos).status_code == 200
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', registrar)
+        try:
+            assert cliente.get(caminho, headers=cabecalhos).status_code == 200
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', registrar)
+    return len(comandos)
+
+def consultas_com_volume(criar_app, quantidade):
+    app = criar_app(f'volume{quantidade}')
+    with app.app_context():
+        GeradorDados(usuarios=quantidade, desafios=quantidade, resultados_por_usuario=quantidade,
+                     avaliacoes_por_usuario=quantidade, pool_senhas=1).executar()
+        token = criar_token_acesso(db.session.get(Usuario, 1))
+    return {caminho: contar_consultas(app, caminho, token) for caminho in ROTAS}
+
+@pytest.mark.parametrize('caminho', ROTAS)
+def test_consultas_nao_crescem_com_o_volume(criar_app, caminho):
+    contagens = [consultas_com_volume(criar_app, quantidade)[caminho] for quantidade in (2, 10, 40)]
+
+    assert contagens[0] > 0
+    assert contagens == [contagens[0]] * len(contagens), f"consultas por volume (2, 10, 40): {contagens}"
@@ -0,0 +1,39 @@
+import sqlite3
+
+from app import db
+from app.identidade import criar_token_acesso
+from app.models import Usuario, Resultado
+from app.resources import desafio
+from seed import seed_database
+
+def test_submissao_concorrente_ao_criar_o_resultado(criar_app, monkeypatch):
+    app = criar_app(PROPAGATE_EXCEPTIONS=False)
+    with app.app_context():
+        seed_database()
+        token = criar_token_acesso(db.session.get(Usuario, 1))
+        caminho = db.engine.url.database
+
+    aplicar_submissao = desafio.aplicar_submissao
+    chamadas = []
+
+    def aplicar_com_concorrente(*args):
+        resultado = aplicar_submissao(*args)
+        if not chamadas:
+            # Outra requisição cria o resultado depois da leitura e antes do commit desta
+            conexao = sqlite3.connect(caminho)
+            conexao.execute("INSERT INTO resultados (usuario_id, desafio_id, status, pontuacao) "
+                            "VALUES (1, 1, 'em_andamento', 0)")
+            conexao.commit()
+            conexao.close()
+        chamadas.append(args)
+        return resultado
+    monkeypatch.setattr(desafio, 'aplicar_submissao', aplicar_com_concorrente)
+
+    resposta = app.test_client().post('/api/desafios/1/submeter', headers={'Authorization': f'Bearer {token}'},
+                                      json={'respostasQuiz': {'1': 1}})
+
+    assert resposta.status_code == 200
+    assert len(chamadas) == 2
+    with app.app_context():
+        resultados = Resultado.query.filter_by(usuario_id=1, desafio_id=1).all()
+        assert [resultado.respostas_quiz for resultado in resultados] == [{'1': 1}]
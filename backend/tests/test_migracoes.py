@@ -0,0 +1,31 @@
+from app import db
+from app.commands import migrar
+from app.models import EstatisticaUsuario
+from seed import GeradorDados
+
+def estatisticas(app):
+    with app.app_context():
+        return sorted(
+            (linha.usuario_id, linha.desafios_concluidos, linha.pontos_quiz_total, linha.sequencia_atual,
+             linha.data_ultima_conclusao)
+            for linha in EstatisticaUsuario.query
+        )
+
+def test_migrar_cria_as_estatisticas_ausentes(criar_app):
+    app = criar_app()
+    with app.app_context():
+        GeradorDados(usuarios=15, desafios=20, resultados_por_usuario=12, pool_senhas=1, dias_historico=30).executar()
+    esperadas = estatisticas(app)
+
+    # Usuários criados antes da tabela de estatísticas
+    with app.app_context():
+        EstatisticaUsuario.query.filter(EstatisticaUsuario.usuario_id % 2 == 0).delete()
+        db.session.commit()
+    assert len(estatisticas(app)) < len(esperadas)
+
+    saida = app.test_cli_runner().invoke(migrar).output
+    assert 'criar_estatisticas_ausentes: estatísticas criadas para 7 usuário(s)' in saida
+    assert estatisticas(app) == esperadas
+
+    saida = app.test_cli_runner().invoke(migrar).output
+    assert 'criar_estatisticas_ausentes: nada a fazer' in saida
@@ -0,0 +1,47 @@
+import shutil
+import sqlite3
+
+from app import db
+from app.banco import COOKIE_PRIMARIO
+from app.identidade import criar_token_acesso
+from app.models import Usuario
+from seed import GeradorDados
+
+def test_leituras_na_replica_e_escritas_no_primario(criar_app, tmp_path, monkeypatch):
+    # init_app registra os metadados do bind 'replica' no db compartilhado; não deixá-los para os demais testes
+    monkeypatch.setattr(db, 'metadatas', dict(db.metadatas))
+    replica = tmp_path / 'replica.db'
+    app = criar_app('primario', SQLALCHEMY_BINDS={'replica': f'sqlite:///{replica}'})
+    with app.app_context():
+        GeradorDados(usuarios=2, desafios=3, resultados_por_usuario=2, pool_senhas=1).executar()
+        token = criar_token_acesso(db.session.get(Usuario, 1))
+        primario = db.engine.url.database
+        for engine in db.engines.values():
+            engine.dispose()
+
+    # Réplica com uma cópia distinguível dos dados do primário
+    shutil.copyfile(primario, replica)
+    with sqlite3.connect(replica) as conexao:
+        conexao.execute("UPDATE usuarios SET nome = 'Nome na réplica' WHERE id = 1")
+
+    cliente = app.test_client()
+    cabecalhos = {'Authorization': f'Bearer {token}'}
+
+    resposta = cliente.get('/api/users/me', headers=cabecalhos)
+    assert resposta.get_json()['usuario']['nome'] == 'Nome na réplica'
+    assert COOKIE_PRIMARIO not in resposta.headers.get('Set-Cookie', '')
+
+    resposta = cliente.put('/api/users/perfil', headers=cabecalhos, json={'nome': 'Nome novo'})
+    assert resposta.status_code == 200
+    assert COOKIE_PRIMARIO in resposta.headers['Set-Cookie']
+    with sqlite3.connect(primario) as conexao:
+        assert conexao.execute("SELECT nome FROM usuarios WHERE id = 1").fetchone() == ('Nome novo',)
+    with sqlite3.connect(replica) as conexao:
+        assert conexao.execute("SELECT nome FROM usuarios WHERE id = 1").fetchone() == ('Nome na réplica',)
+
+    # O cliente de teste reenvia o cookie: a leitura seguinte enxerga a própria escrita
+    assert cliente.get('/api/users/me', headers=cabecalhos).get_json()['usuario']['nome'] == 'Nome novo'
+
+    # Sem o cookie, as leituras voltam para a réplica
+    cliente.delete_cookie(COOKIE_PRIMARIO)
+    assert cliente.get('/api/users/me', headers=cabecalhos).get_json()['usuario']['nome'] == 'Nome na réplica'
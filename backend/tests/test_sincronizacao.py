@@ -0,0 +1,101 @@
+import sqlite3
+
+import pytest
+
+from app import db
+from app.identidade import criar_token_acesso
+from app.models import Usuario, Avaliacao, Resultado, SubmissaoDesafio
+from app.resources import sincronizacao
+from seed import seed_database
+
+def avaliacao(id_cliente):
+    return {'id_cliente': id_cliente, 'tipo': 'avaliacao', 'respostas': {str(numero): 3 for numero in range(1, 11)}}
+
+def quiz(id_cliente, respostas, desafio_id=1):
+    return {'id_cliente': id_cliente, 'tipo': 'desafio', 'desafio_id': desafio_id, 'respostasQuiz': respostas}
+
+@pytest.fixture
+def app(criar_app):
+    app = criar_app(PROPAGATE_EXCEPTIONS=False)
+    with app.app_context():
+        seed_database()
+    return app
+
+@pytest.fixture
+def sincronizar(app):
+    with app.app_context():
+        token = criar_token_acesso(db.session.get(Usuario, 1))
+    cliente = app.test_client()
+
+    def enviar(*itens):
+        return cliente.post('/api/sync', headers={'Authorization': f'Bearer {token}'}, json={'itens': list(itens)})
+    return enviar
+
+def gravar_em_outra_conexao(app, sql):
+    """Simula uma sincronização concorrente que grava e confirma antes da requisição atual"""
+    with app.app_context():
+        caminho = db.engine.url.database
+    conexao = sqlite3.connect(caminho)
+    try:
+        conexao.execute(sql)
+        conexao.commit()
+    finally:
+        conexao.close()
+
+def status(resposta):
+    return [(item['id_cliente'], item['status']) for item in resposta.get_json()['resultados']]
+
+def test_falha_na_segunda_etapa_desfaz_a_primeira(app, sincronizar, monkeypatch):
+    def falhar(*args):
+        raise RuntimeError('falha simulada')
+    monkeypatch.setattr(sincronizacao, 'sincronizar_desafios', falhar)
+
+    resposta = sincronizar(avaliacao('av-1'), quiz('quiz-1', {'1': 0}))
+
+    assert resposta.status_code == 500
+    with app.app_context():
+        assert Avaliacao.query.count() == 0
+
+def test_reenvio_de_submissao_antiga_e_duplicado(app, sincronizar):
+    assert status(sincronizar(quiz('a', {'1': 0}), quiz('b', {'1': 1}))) == [('a', 'substituido'), ('b', 'criado')]
+    assert status(sincronizar(quiz('c', {'1': 1, '2': 2}))) == [('c', 'atualizado')]
+    assert status(sincronizar(quiz('a', {'1': 0}), quiz('b', {'1': 1}))) == [('a', 'duplicado'), ('b', 'duplicado')]
+
+    with app.app_context():
+        assert db.session.query(Resultado.id_cliente).filter_by(usuario_id=1, desafio_id=1).scalar() == 'c'
+        assert SubmissaoDesafio.query.count() == 3
+
+def test_avaliacao_gravada_por_sincronizacao_concorrente_e_duplicado(app, sincronizar, monkeypatch):
+    medias_por_categoria = Avaliacao.medias_por_categoria
+
+    def gravar_antes(*args):
+        # Executado depois da leitura dos id_cliente já sincronizados
+        gravar_em_outra_conexao(app, "INSERT INTO avaliacoes (usuario_id, pontuacao, id_cliente) VALUES (1, 60, 'av-1')")
+        return medias_por_categoria(*args)
+    monkeypatch.setattr(Avaliacao, 'medias_por_categoria', staticmethod(gravar_antes))
+
+    resposta = sincronizar(avaliacao('av-1'))
+
+    assert resposta.status_code == 200
+    assert status(resposta) == [('av-1', 'duplicado')]
+    with app.app_context():
+        assert Avaliacao.query.count() == 1
+
+def test_resultado_criado_por_requisicao_concorrente_recebe_a_submissao(app, sincronizar, monkeypatch):
+    obter = sincronizacao.gabaritos.obter
+
+    def gravar_antes(desafio_id):
+        gravar_em_outra_conexao(
+            app, "INSERT INTO resultados (usuario_id, desafio_id, status, pontuacao) VALUES (1, 1, 'em_andamento', 0)"
+        )
+        monkeypatch.setattr(sincronizacao.gabaritos, 'obter', obter)
+        return obter(desafio_id)
+    monkeypatch.setattr(sincronizacao.gabaritos, 'obter', gravar_antes)
+
+    resposta = sincronizar(quiz('quiz-1', {'1': 1}))
+
+    assert resposta.status_code == 200
+    assert status(resposta) == [('quiz-1', 'atualizado')]
+    with app.app_context():
+        resultados = Resultado.query.filter_by(usuario_id=1, desafio_id=1).all()
+        assert [(resultado.id_cliente, resultado.respostas_quiz) for resultado in resultados] == [('quiz-1', {'1': 1})]